@@ -229,7 +229,6 @@ async def update_trigger_word(
         )
     
     dataset.trigger_word = request.trigger_word.strip()
-    dataset.updated_at = datetime.utcnow()
     db.commit()
     
     return {"message": "Trigger word updated successfully"}
@@ -7,7 +7,7 @@ from datetime import datetime
 
 from app.core.database import get_db, Character, InferenceJob, User
 from app.core.auth import get_current_active_user, get_current_user_optional
-from app.services.charforge_integration import CharForgeIntegration, InferenceConfig
+from app.services.charforge_integration import CharForgeIntegration, get_charforge, InferenceConfig
 from app.services.settings_service import get_user_env_vars
 
 router = APIRouter()
@@ -53,9 +53,6 @@ class InferenceJobResponse(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime]
 
-# Global integration instance
-charforge = CharForgeIntegration()
-
 @router.post("/generate", response_model=InferenceResponse)
 async def generate_images(
     request: InferenceRequest,
@@ -150,7 +147,7 @@ async def run_inference_background(
         )
         
         # Run inference
-        result = await charforge.run_inference(config, env_vars)
+        result = await get_charforge().run_inference(config, env_vars)
         
         # Update job with results
         job.status = "completed" if result["success"] else "failed"
@@ -268,7 +265,8 @@ async def get_inference_job(
 async def get_character_info(
     character_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_optional)
+    current_user: User = Depends(get_current_user_optional),
+    charforge: CharForgeIntegration = Depends(get_charforge)
 ):
     """Get detailed information about a character including LoRA status."""
     
@@ -302,7 +300,8 @@ async def get_character_info(
 @router.get("/available-characters")
 async def list_available_characters(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_optional)
+    current_user: User = Depends(get_current_user_optional),
+    charforge: CharForgeIntegration = Depends(get_charforge)
 ):
     """List all characters available for inference (completed training)."""
     
@@ -8,7 +8,7 @@ from pathlib import Path
 
 from app.core.database import get_db, Character, TrainingSession, User
 from app.core.auth import get_current_active_user, get_current_user_optional
-from app.services.charforge_integration import CharForgeIntegration, CharacterConfig
+from app.services.charforge_integration import CharForgeIntegration, get_charforge, CharacterConfig
 from app.services.settings_service import get_user_env_vars
 
 router = APIRouter()
@@ -95,14 +95,12 @@ class CharacterCreateRequest(BaseModel):
     name: str
     input_image_path: str
 
-# Global integration instance
-charforge = CharForgeIntegration()
-
 @router.post("/characters", response_model=CharacterResponse)
 async def create_character(
     request: CharacterCreateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    charforge: CharForgeIntegration = Depends(get_charforge)
 ):
     """Create a new character."""
 
@@ -357,7 +355,7 @@ async def run_training_background(
             db.commit()
         
         # Run training
-        result = await charforge.run_training(config, env_vars, update_progress)
+        result = await get_charforge().run_training(config, env_vars, update_progress)
         
         # Update session with results
         session.status = "completed" if result["success"] else "failed"
@@ -3,10 +3,12 @@ from typing import List
 import os
 from pathlib import Path
 
+_TRUTHY_VALUES = frozenset({"1", "true", "yes", "on"})
+
 def _parse_bool_env(var_name: str, default: str = "false") -> bool:
     """Parse boolean environment variable with multiple valid representations."""
     val = os.getenv(var_name, default)
-    return str(val).strip().lower() in {"1", "true", "yes", "on"}
+    return str(val).strip().lower() in _TRUTHY_VALUES
 
 class Settings(BaseSettings):
     # API Configuration
@@ -42,6 +44,7 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./database.db"
+    RUN_MIGRATIONS: bool = _parse_bool_env("RUN_MIGRATIONS", "true")  # Create missing tables on startup
     
     # CORS - Enhanced for remote access
     ALLOWED_ORIGINS: List[str] = [
@@ -56,6 +59,7 @@ class Settings(BaseSettings):
     # Server Configuration
     HOST: str = "0.0.0.0"  # Allow external connections
     PORT: int = 8000
+    WORKERS: int = 1  # Only used outside development; each worker keeps its own rate limiter state
     FRONTEND_HOST: str = "0.0.0.0"
     FRONTEND_PORT: int = 5173
     
@@ -76,6 +80,10 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = ""
     FAL_KEY: str = ""
     
+    # Keep one warm train_character.py process for all training jobs instead of spawning per job.
+    # The worker keeps the HF_HOME it started with; jobs with another HF_HOME get their own process.
+    TRAINING_WORKER: bool = _parse_bool_env("TRAINING_WORKER", "false")
+
     # Training Defaults
     DEFAULT_STEPS: int = 800
     DEFAULT_BATCH_SIZE: int = 1
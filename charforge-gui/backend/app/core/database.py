@@ -1,7 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Float
+from sqlalchemy import create_engine, Column, Index, Integer, String, DateTime, Boolean, Text, Float, func, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
 from app.core.config import settings
 
 engine = create_engine(
@@ -21,7 +20,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
 
 class Character(Base):
     __tablename__ = "characters"
@@ -32,7 +31,7 @@ class Character(Base):
     input_image_path = Column(String, nullable=False)
     work_dir = Column(String, nullable=False)
     status = Column(String, default="created")  # created, training, completed, failed
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime, nullable=True)
 
 class TrainingSession(Base):
@@ -52,7 +51,7 @@ class TrainingSession(Base):
     log_file = Column(String, nullable=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
 
 class InferenceJob(Base):
     __tablename__ = "inference_jobs"
@@ -72,21 +71,23 @@ class InferenceJob(Base):
     face_enhance = Column(Boolean, default=False)
     status = Column(String, default="pending")  # pending, running, completed, failed
     output_paths = Column(Text, nullable=True)  # JSON array of file paths
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
     completed_at = Column(DateTime, nullable=True)
 
 class AppSettings(Base):
     __tablename__ = "app_settings"
+    __table_args__ = (Index("ix_app_settings_user_key", "user_id", "key"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
     key = Column(String, nullable=False)
     value = Column(Text, nullable=True)
     is_encrypted = Column(Boolean, default=False)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now())
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (Index("ix_datasets_user_name", "user_id", "name"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -100,19 +101,30 @@ class Dataset(Base):
     quality_filter = Column(String, default="basic")
     image_count = Column(Integer, default=0)
     status = Column(String, default="created")  # created, processing, ready, failed
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now())
 
 class DatasetImage(Base):
     __tablename__ = "dataset_images"
 
     id = Column(Integer, primary_key=True, index=True)
-    dataset_id = Column(Integer, nullable=False)
+    dataset_id = Column(Integer, nullable=False, index=True)
     filename = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
     caption = Column(Text, nullable=True)
     processed = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+
+def init_db():
+    """Create any missing tables, skipping create_all when the schema is complete."""
+    existing_tables = set(inspect(engine).get_table_names())
+    if not set(Base.metadata.tables).issubset(existing_tables):
+        Base.metadata.create_all(bind=engine)
+
+def warm_up_engine():
+    """Open a pooled connection up front so the first request does not pay for it."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
 
 # Dependency to get database session
 def get_db() -> Session:
@@ -123,4 +135,4 @@ def get_db() -> Session:
         db.close()
 
 # Export SessionLocal for background tasks
-__all__ = ["Base", "engine", "SessionLocal", "get_db", "User", "Character", "TrainingSession", "InferenceSession", "AppSettings", "Dataset", "DatasetImage"]
+__all__ = ["Base", "engine", "SessionLocal", "get_db", "init_db", "warm_up_engine", "User", "Character", "TrainingSession", "InferenceSession", "AppSettings", "Dataset", "DatasetImage"]
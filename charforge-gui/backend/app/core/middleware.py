@@ -1,17 +1,13 @@
 """Middleware for optional authentication."""
 
 from fastapi import Request, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
 
 from app.core.config import settings
 from app.core.database import SessionLocal, User
 from app.core.auth import get_current_user_from_token
 
-security = HTTPBearer(auto_error=False)
-
 async def get_current_user_middleware(request: Request) -> User:
     """Middleware to get current user with optional authentication."""
     
@@ -23,10 +19,10 @@ async def get_current_user_middleware(request: Request) -> User:
         finally:
             db.close()
     
-    # When auth is enabled, extract token from request
-    authorization: Optional[HTTPAuthorizationCredentials] = await security(request)
+    # When auth is enabled, extract the bearer token straight from the header
+    authorization = request.headers.get("authorization")
     
-    if not authorization:
+    if not authorization or authorization[:7].lower() != "bearer ":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
@@ -35,7 +31,7 @@ async def get_current_user_middleware(request: Request) -> User:
     
     db = SessionLocal()
     try:
-        user = await get_current_user_from_token(authorization.credentials, db)
+        user = await get_current_user_from_token(authorization[7:].strip(), db)
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
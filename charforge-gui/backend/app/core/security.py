@@ -1,8 +1,8 @@
 """Security middleware and utilities for CharForge GUI."""
 
 import time
-from collections import defaultdict
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import List, Tuple
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 import logging
@@ -10,10 +10,12 @@ import logging
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    """Simple in-memory rate limiter."""
+    """In-memory token bucket rate limiter keyed on client and endpoint type."""
     
-    def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
+    def __init__(self, max_keys: int = 50_000):
+        # (identifier, endpoint_type) -> [tokens, last_refill], least recently used first
+        self.buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self.max_keys = max_keys
         self.limits = {
             "auth": (5, 300),      # 5 requests per 5 minutes for auth endpoints
             "upload": (10, 60),    # 10 uploads per minute
@@ -24,54 +26,77 @@ class RateLimiter:
     
     def is_allowed(self, identifier: str, endpoint_type: str = "default") -> bool:
         """Check if request is allowed based on rate limits."""
-        now = time.time()
-        limit, window = self.limits.get(endpoint_type, self.limits["default"])
+        now = time.monotonic()
+        capacity, window = self.limits.get(endpoint_type, self.limits["default"])
+        key = (identifier, endpoint_type)
         
-        # Clean old requests
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if now - req_time < window
-        ]
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(capacity), now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            # Refill at capacity/window tokens per second
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / window)
+            bucket[1] = now
         
-        # Check if limit exceeded
-        if len(self.requests[identifier]) >= limit:
+        if bucket[0] < 1:
             return False
         
-        # Add current request
-        self.requests[identifier].append(now)
+        bucket[0] -= 1
         return True
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
-async def rate_limit_middleware(request: Request, call_next):
-    """Rate limiting middleware."""
-    # Get client identifier (IP address)
-    client_ip = request.client.host
-    
-    # Determine endpoint type
-    path = request.url.path
-    endpoint_type = "default"
-    
-    if "/auth/" in path:
-        endpoint_type = "auth"
-    elif "/media/upload" in path:
-        endpoint_type = "upload"
-    elif "/training/" in path and request.method == "POST":
-        endpoint_type = "training"
-    elif "/inference/" in path and request.method == "POST":
-        endpoint_type = "inference"
-    
-    # Check rate limit
-    if not rate_limiter.is_allowed(client_ip, endpoint_type):
-        logger.warning(f"Rate limit exceeded for {client_ip} on {path}")
-        return JSONResponse(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            content={"detail": "Rate limit exceeded. Please try again later."}
-        )
-    
-    response = await call_next(request)
-    return response
+# (path prefix, HTTP method or None for any, endpoint type), first match wins
+_ROUTE_RULES = (
+    ("/api/auth/", None, "auth"),
+    ("/api/media/upload", None, "upload"),
+    ("/api/training/", "POST", "training"),
+    ("/api/inference/", "POST", "inference"),
+)
+
+# Static mounts and infrastructure endpoints that bypass rate limiting
+_UNLIMITED_PREFIXES = ("/media/", "/results/", "/health", "/docs", "/openapi.json")
+_STATIC_PREFIXES = ("/media/", "/results/")
+
+class RateLimitMiddleware:
+    """Pure ASGI rate limiting middleware."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(_UNLIMITED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # Get client identifier (IP address)
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        # Determine endpoint type
+        path = scope["path"]
+        endpoint_type = "default"
+
+        for prefix, method, rule_type in _ROUTE_RULES:
+            if path.startswith(prefix) and (method is None or scope["method"] == method):
+                endpoint_type = rule_type
+                break
+
+        # Check rate limit
+        if not rate_limiter.is_allowed(client_ip, endpoint_type):
+            logger.warning(f"Rate limit exceeded for {client_ip} on {path}")
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded. Please try again later."}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
 
 def validate_file_upload(file_content: bytes, filename: str, max_size: int = 50 * 1024 * 1024) -> bool:
     """Validate uploaded file for security."""
@@ -147,32 +172,49 @@ def validate_json_input(data: dict, max_depth: int = 10, max_keys: int = 100) ->
     
     return count_depth(data)
 
-class SecurityHeaders:
-    """Security headers middleware."""
-    
-    @staticmethod
-    def add_security_headers(response):
-        """Add security headers to response."""
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: blob:; "
-            "font-src 'self'; "
-            "connect-src 'self'; "
-            "frame-ancestors 'none';"
-        )
-        return response
-
-async def security_headers_middleware(request: Request, call_next):
-    """Add security headers to all responses."""
-    response = await call_next(request)
-    return SecurityHeaders.add_security_headers(response)
+# Security headers encoded once as raw ASGI header pairs
+_SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"content-security-policy", (
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline'; "
+        b"style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data: blob:; "
+        b"font-src 'self'; "
+        b"connect-src 'self'; "
+        b"frame-ancestors 'none';"
+    )),
+)
+# Static files only need MIME sniffing disabled
+_STATIC_SECURITY_HEADERS = ((b"x-content-type-options", b"nosniff"),)
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware that adds security headers to all responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Preflight responses are never rendered, so the headers are irrelevant there
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"].startswith(_STATIC_PREFIXES):
+            extra_headers = _STATIC_SECURITY_HEADERS
+        else:
+            extra_headers = _SECURITY_HEADERS
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 def log_security_event(event_type: str, details: dict, request: Request):
     """Log security-related events."""
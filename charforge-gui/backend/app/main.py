@@ -1,28 +1,54 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
+from datetime import datetime
+import orjson
+import logging
 import os
+import time
 from pathlib import Path
 
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.core.security import rate_limit_middleware, security_headers_middleware
+from app.core.database import init_db, warm_up_engine
+from app.core.security import RateLimitMiddleware, SecurityHeadersMiddleware
+from app.services.charforge_integration import get_charforge
 from app.api import auth, training, inference, media, datasets, models, settings as settings_api
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# Text sidecars worth compressing; images in /media and /results are already compressed
+COMPRESSIBLE_SUFFIXES = (".json", ".txt", ".log", ".yaml", ".yml", ".csv", ".svg")
+
+class CompressedStaticFiles(StaticFiles):
+    """StaticFiles that gzips text assets. ETag/Last-Modified 304s are handled by StaticFiles."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._gzip_app = GZipMiddleware(super().__call__, minimum_size=1024, compresslevel=5)
+
+    async def __call__(self, scope, receive, send):
+        if scope["path"].lower().endswith(COMPRESSIBLE_SUFFIXES):
+            await self._gzip_app(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
 
 app = FastAPI(
     title="CharForge GUI API",
     description="API for CharForge AI Character LoRA Creation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 @app.on_event("startup")
 async def startup_event():
-    """Import existing datasets from scratch folder when auth is disabled."""
+    """Prepare the database and CharForge integration, and import datasets when auth is disabled."""
+    if settings.RUN_MIGRATIONS:
+        init_db()
+    warm_up_engine()
+    get_charforge()
+
     if not settings.ENABLE_AUTH:
         from app.services.dataset_import import import_datasets_from_scratch
         from app.core.database import SessionLocal
@@ -34,46 +60,40 @@ async def startup_event():
 
 # CORS configuration - Enhanced for remote access
 # Only allow all origins in development mode
-cors_origins = settings.ALLOWED_ORIGINS
 if os.getenv("ENVIRONMENT", "development") == "development":
-    cors_origins = ["*"]  # Allow all origins only in development
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=cors_origins,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins only in development
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+else:
+    # Concrete lists let Starlette precompute the preflight headers once
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=("GET", "POST", "PUT", "DELETE", "PATCH"),
+        allow_headers=("Authorization", "Content-Type"),
+        max_age=600,
+    )
 
-# Global exception handler
+# Unhandled exception handler. HTTPException keeps FastAPI's default handler,
+# so expected 4xx responses never pay for traceback formatting.
 @app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    """Global exception handler for better error reporting."""
-    import logging
-    import traceback
-
-    # Log the error
-    logging.error(f"Global exception on {request.url}: {str(exc)}")
-    logging.error(traceback.format_exc())
-
-    # Return appropriate error response
-    if isinstance(exc, HTTPException):
-        return JSONResponse(
-            status_code=exc.status_code,
-            content={"detail": exc.detail}
-        )
-
-    # For unexpected errors, return generic message
-    return JSONResponse(
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Log unexpected errors and return a generic 500."""
+    logger.error("Unhandled exception on %s", request.url, exc_info=exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 # Add security middleware
-app.middleware("http")(rate_limit_middleware)
-app.middleware("http")(security_headers_middleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
 
 # Create necessary directories
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -81,44 +101,63 @@ os.makedirs(settings.MEDIA_DIR, exist_ok=True)
 os.makedirs(settings.RESULTS_DIR, exist_ok=True)
 
 # Mount static files
-app.mount("/media", StaticFiles(directory=settings.MEDIA_DIR), name="media")
-app.mount("/results", StaticFiles(directory=settings.RESULTS_DIR), name="results")
+app.mount("/media", CompressedStaticFiles(directory=settings.MEDIA_DIR), name="media")
+app.mount("/results", CompressedStaticFiles(directory=settings.RESULTS_DIR), name="results")
 
 # Include routers
+# All API routers are assembled under one /api router and mounted on the app once.
+# Auth is enforced per endpoint because /api/auth and several read endpoints stay public.
+api_router = APIRouter(prefix="/api")
+
 # Always include auth config endpoint, conditionally include other auth routes
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
+api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 
 # Note: The auth router now includes conditional logic for auth-only endpoints
 
-app.include_router(training.router, prefix="/api/training", tags=["training"])
-app.include_router(inference.router, prefix="/api/inference", tags=["inference"])
-app.include_router(media.router, prefix="/api/media", tags=["media"])
-app.include_router(datasets.router, prefix="/api/datasets", tags=["datasets"])
-app.include_router(models.router, prefix="/api/models", tags=["models"])
-app.include_router(settings_api.router, prefix="/api/settings", tags=["settings"])
+api_router.include_router(training.router, prefix="/training", tags=["training"])
+api_router.include_router(inference.router, prefix="/inference", tags=["inference"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
+api_router.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
+api_router.include_router(models.router, prefix="/models", tags=["models"])
+api_router.include_router(settings_api.router, prefix="/settings", tags=["settings"])
+
+app.include_router(api_router)
+
+# Static bodies for the root and health endpoints, served as plain Starlette routes
+_ROOT_BODY = orjson.dumps({"message": "CharForge GUI API", "version": "1.0.0"})
+_HEALTH_CACHE = {"second": None, "body": b""}
 
-@app.get("/")
-async def root():
-    return {"message": "CharForge GUI API", "version": "1.0.0"}
+async def root(request: Request):
+    return Response(_ROOT_BODY, media_type="application/json")
 
-@app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint for monitoring."""
-    from datetime import datetime
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "version": "1.0.0"
-    }
+    now = int(time.time())
+    # Rebuild the body at most once per second
+    if now != _HEALTH_CACHE["second"]:
+        _HEALTH_CACHE["body"] = orjson.dumps({
+            "status": "healthy",
+            "timestamp": datetime.utcfromtimestamp(now).isoformat(),
+            "version": "1.0.0"
+        })
+        _HEALTH_CACHE["second"] = now
+    return Response(_HEALTH_CACHE["body"], media_type="application/json")
+
+app.add_route("/", root, methods=["GET"])
+app.add_route("/health", health_check, methods=["GET"])
 
 if __name__ == "__main__":
     import uvicorn
+    development = os.getenv("ENVIRONMENT", "development") == "development"
     uvicorn.run(
-        app,
+        "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
-        reload_dirs=["app"],
-        access_log=True,
+        loop="uvloop",
+        http="httptools",
+        reload=development,
+        reload_dirs=["app"] if development else None,
+        workers=1 if development else settings.WORKERS,
+        access_log=development,
         log_level="info"
     )
@@ -3,14 +3,163 @@ import sys
 import subprocess
 import asyncio
 import json
+import re
 from pathlib import Path
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 import shutil
+from collections import OrderedDict, deque
 
 from app.core.config import settings
 
-@dataclass
+# Subprocess output is read in large chunks on an executor thread and split into lines there
+STREAM_READ_SIZE = 64 * 1024
+
+# Progress lines look like "Step 100/800"; saved images like "✅ Saved image to: /path/to/file.jpg"
+STEP_PATTERN = re.compile(r"\bStep\s+(\d+)\s*/\s*(\d+)")
+SAVED_IMAGE_PATTERN = re.compile(r"Saved image to:\s*(\S.*)")
+
+# User settings forwarded to CharForge subprocesses
+SUBPROCESS_ENV_KEYS = ('HF_HOME', 'HF_TOKEN', 'CIVITAI_API_KEY', 'GOOGLE_API_KEY', 'FAL_KEY')
+
+# Settings a running training worker can switch per job; huggingface_hub reads HF_HOME
+# once at import, so the worker's HF_HOME is fixed when it starts
+WORKER_JOB_ENV_KEYS = tuple(key for key in SUBPROCESS_ENV_KEYS if key != 'HF_HOME')
+
+SHEET_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+# Most recently used character info entries kept in memory
+CHARACTER_INFO_CACHE_SIZE = 256
+
+# Input sanitisation, done in one C-level pass per value
+PROMPT_STRIP_TABLE = str.maketrans('', '', '`$\\;|&><')
+UNSAFE_NAME_CHARS = re.compile(r"[^\w-]")  # \w is Unicode-aware, matching str.isalnum() plus '_'
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+CHARACTER_NAME_PATTERN = re.compile(r"(?=.*[^\W_])[\w-]{1,100}")  # at least one letter or digit
+
+# Training output kept in memory for the result; the full log goes to work_dir/train.log
+TRAINING_OUTPUT_TAIL_LINES = 2000
+TRAINING_LOG_NAME = "train.log"
+TRAINING_LOG_BUFFER_SIZE = 64 * 1024
+
+# Printed by train_character.py --worker after each job, followed by the exit code
+WORKER_DONE_MARKER = "__CHARFORGE_WORKER_DONE__"
+
+def _mtime_ns(path) -> Optional[int]:
+    """Return the mtime of a path in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _drain_pipe(read_fd: int, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+    """Blocking pipe reader for an executor thread; forwards each chunk's lines to the loop."""
+    pending = bytearray()
+    try:
+        while True:
+            chunk = os.read(read_fd, STREAM_READ_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            lines = []
+            start = 0
+            while True:
+                end = pending.find(b"\n", start)
+                if end == -1:
+                    break
+                lines.append(pending[start:end].decode(errors="replace").strip())
+                start = end + 1
+            del pending[:start]
+            if lines:
+                loop.call_soon_threadsafe(queue.put_nowait, lines)
+        if pending:
+            loop.call_soon_threadsafe(queue.put_nowait, [pending.decode(errors="replace").strip()])
+    finally:
+        os.close(read_fd)
+        loop.call_soon_threadsafe(queue.put_nowait, None)
+
+class TrainingWorker:
+    """
+    Long-lived `train_character.py --worker` process.
+
+    Keeps torch and the training stack imported between jobs instead of paying the
+    interpreter and import cost on every request. Jobs run one at a time, and only
+    jobs with the HF_HOME the worker was started with.
+    """
+
+    def __init__(self, charforge_root: Path, base_env: Dict[str, str]):
+        self.charforge_root = charforge_root
+        self.env = {**base_env, 'PYTHONUNBUFFERED': '1'}
+        self.hf_home = None
+        self.process = None
+        self.lines: Optional[asyncio.Queue] = None
+        self.lock = asyncio.Lock()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self, hf_home: str):
+        """Spawn the worker for one HF_HOME and start draining its output on an executor thread."""
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                str(self.charforge_root / "train_character.py"),
+                "--worker",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=write_fd,
+                stderr=asyncio.subprocess.STDOUT,
+                env={**self.env, 'HF_HOME': hf_home},
+                cwd=str(self.charforge_root),
+                close_fds=True
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self.hf_home = hf_home
+        loop = asyncio.get_running_loop()
+        self.lines = asyncio.Queue()
+        loop.run_in_executor(None, _drain_pipe, read_fd, loop, self.lines)
+
+    async def run(self, args: List[str], env: Dict[str, str], on_line: Callable[[str], None]) -> Optional[int]:
+        """
+        Run one training job and return its exit code.
+
+        Returns None if the running worker has a different HF_HOME than the job, and
+        raises OSError if the worker cannot be started or sent the job. In both cases
+        no output has been consumed and the caller can fall back to a subprocess.
+        """
+        hf_home = env.get('HF_HOME', '')
+        async with self.lock:
+            if not self.is_alive():
+                await self.start(hf_home)
+            elif hf_home != self.hf_home:
+                return None
+
+            # Always send every key so one user's credentials never leak into the next job
+            job = {"args": args, "env": {key: env.get(key) for key in WORKER_JOB_ENV_KEYS}}
+            self.process.stdin.write(json.dumps(job).encode() + b"\n")
+            await self.process.stdin.drain()
+
+            while True:
+                lines = await self.lines.get()
+                if lines is None:
+                    # Worker died mid-job; the next job starts a fresh one
+                    returncode = await self.process.wait()
+                    self.process = None
+                    return returncode or 1
+                for line in lines:
+                    if line.startswith(WORKER_DONE_MARKER):
+                        return int(line[len(WORKER_DONE_MARKER):].strip() or 1)
+                    on_line(line)
+
+# Shared immutable default, so MVAdapterConfig() needs no per-instance list
+DEFAULT_AZIMUTH_DEGREES = (0, 45, 90, 180, 270, 315)
+
+@dataclass(slots=True)
 class ModelConfig:
     """Model configuration for training."""
     base_model: str = "RunDiffusion/Juggernaut-XL-v9"
@@ -20,7 +169,7 @@ class ModelConfig:
     scheduler: str = "ddpm"
     dtype: str = "float16"
 
-@dataclass
+@dataclass(slots=True)
 class MVAdapterConfig:
     """MV Adapter configuration."""
     enabled: bool = False
@@ -29,14 +178,10 @@ class MVAdapterConfig:
     width: int = 768
     guidance_scale: float = 3.0
     reference_conditioning_scale: float = 1.0
-    azimuth_degrees: List[int] = None
+    azimuth_degrees: Tuple[int, ...] = DEFAULT_AZIMUTH_DEGREES
     remove_background: bool = True
 
-    def __post_init__(self):
-        if self.azimuth_degrees is None:
-            self.azimuth_degrees = [0, 45, 90, 180, 270, 315]
-
-@dataclass
+@dataclass(slots=True)
 class AdvancedTrainingConfig:
     """Advanced training configuration."""
     optimizer: str = "adamw"
@@ -97,6 +242,53 @@ class InferenceConfig:
     safety_check: bool = True
     face_enhance: bool = False
 
+# Training options as (flag, attribute, kind): "value" passes str(value), "optional" does
+# the same but only when the value is set, and "switch" adds a bare flag when true
+MODEL_CONFIG_FLAGS = (
+    ("--base_model", "base_model", "value"),
+    ("--vae_model", "vae_model", "value"),
+    ("--unet_model", "unet_model", "optional"),
+    ("--scheduler", "scheduler", "value"),
+    ("--dtype", "dtype", "value"),
+)
+MV_ADAPTER_FLAGS = (
+    ("--use_mv_adapter", "enabled", "switch"),
+    ("--num_views", "num_views", "value"),
+    ("--mv_height", "height", "value"),
+    ("--mv_width", "width", "value"),
+    ("--guidance_scale", "guidance_scale", "value"),
+    ("--reference_conditioning_scale", "reference_conditioning_scale", "value"),
+    ("--remove_background", "remove_background", "switch"),
+)
+ADVANCED_TRAINING_FLAGS = (
+    ("--optimizer", "optimizer", "value"),
+    ("--weight_decay", "weight_decay", "value"),
+    ("--lr_scheduler", "lr_scheduler", "value"),
+    ("--gradient_accumulation", "gradient_accumulation", "value"),
+    ("--mixed_precision", "mixed_precision", "value"),
+    ("--save_every", "save_every", "value"),
+    ("--max_saves", "max_saves", "value"),
+    ("--gradient_checkpointing", "gradient_checkpointing", "switch"),
+    ("--train_text_encoder", "train_text_encoder", "switch"),
+)
+COMFYUI_MODEL_FLAGS = (
+    ("--comfyui_checkpoint", "comfyui_checkpoint", "optional"),
+    ("--comfyui_vae", "comfyui_vae", "optional"),
+    ("--comfyui_lora", "comfyui_lora", "optional"),
+)
+
+def _option_args(config, flags) -> List[str]:
+    """Turn a config object into command line arguments using a flag table."""
+    args = []
+    for flag, attr, kind in flags:
+        value = getattr(config, attr)
+        if kind == "switch":
+            if value:
+                args.append(flag)
+        elif kind == "value" or value:
+            args += (flag, str(value))
+    return args
+
 class CharForgeIntegration:
     """Integration layer for CharForge Python scripts."""
     
@@ -106,85 +298,90 @@ class CharForgeIntegration:
         
         # Ensure CharForge directories exist
         os.makedirs(self.scratch_dir, exist_ok=True)
+
+        # Roots that user-supplied work directories must live under, with a trailing
+        # separator so /scratch does not also admit /scratch-other
+        self._allowed_root_prefixes = tuple(
+            os.path.join(str(root.resolve()), '')
+            for root in (self.charforge_root, self.scratch_dir, Path.cwd())
+        )
+
+        # Environment snapshot shared by every CharForge subprocess; the per-user keys are
+        # removed so a user without a setting never runs on the server's credentials
+        self._base_env = {
+            key: value for key, value in os.environ.items() if key not in SUBPROCESS_ENV_KEYS
+        }
+        self._base_env['APP_PATH'] = str(self.charforge_root)
+
+        # Filesystem scan caches, invalidated by directory mtimes
+        self._character_dirs_mtime = None
+        self._character_dirs: List[tuple] = []
+        self._character_info_cache: OrderedDict = OrderedDict()
+
+        self.training_worker = TrainingWorker(self.charforge_root, self._base_env)
     
     def setup_environment(self, env_vars: Dict[str, str]) -> Dict[str, str]:
         """Set up environment variables for CharForge."""
-        env = os.environ.copy()
-        env.update({
-            'APP_PATH': str(self.charforge_root),
-            'HF_HOME': env_vars.get('HF_HOME', ''),
-            'HF_TOKEN': env_vars.get('HF_TOKEN', ''),
-            'CIVITAI_API_KEY': env_vars.get('CIVITAI_API_KEY', ''),
-            'GOOGLE_API_KEY': env_vars.get('GOOGLE_API_KEY', ''),
-            'FAL_KEY': env_vars.get('FAL_KEY', ''),
-        })
+        env = {**self._base_env}
+        for key in SUBPROCESS_ENV_KEYS:
+            env[key] = env_vars.get(key, '')
         return env
 
     def _validate_config(self, config) -> bool:
         """Validate configuration parameters to prevent injection attacks."""
         try:
-            # Validate numeric parameters
-            if not (1 <= int(config.steps) <= 10000):
+            # Validate numeric parameters; values arrive already typed from the API models
+            if not (1 <= config.steps <= 10000):
                 return False
-            if not (1 <= int(config.batch_size) <= 32):
+            if not (1 <= config.batch_size <= 32):
                 return False
-            if not (0.0001 <= float(config.learning_rate) <= 1.0):
+            if not (0.0001 <= config.learning_rate <= 1.0):
                 return False
-            if not (64 <= int(config.train_dim) <= 2048):
+            if not (64 <= config.train_dim <= 2048):
                 return False
-            if not (1 <= int(config.rank_dim) <= 128):
+            if not (1 <= config.rank_dim <= 128):
                 return False
-            if not (0 <= int(config.pulidflux_images) <= 100):
+            if not (0 <= config.pulidflux_images <= 100):
                 return False
 
             # Validate string parameters
-            if not config.name or not config.name.replace('_', '').replace('-', '').isalnum():
-                return False
-            if len(config.name) > 100:
+            if not config.name or not CHARACTER_NAME_PATTERN.fullmatch(config.name):
                 return False
 
-            # Validate file paths
-            if not Path(config.input_image).exists():
+            # Validate file paths last, as it is the only check that touches the disk
+            if not os.path.exists(config.input_image):
                 return False
 
             return True
-        except (ValueError, TypeError):
+        except TypeError:
+            # Missing or non-numeric values
             return False
 
     def _sanitize_string(self, value: str) -> str:
         """Sanitize string input to prevent injection."""
         # Only allow alphanumeric, underscore, and hyphen
-        return ''.join(c for c in value if c.isalnum() or c in '_-')
+        return UNSAFE_NAME_CHARS.sub('', value)
 
     def _is_safe_path(self, path: Path) -> bool:
         """Check if path is safe (no traversal attacks)."""
         try:
             # Resolve the path and check if it's within allowed directories
-            resolved_path = path.resolve()
-            allowed_roots = [
-                self.charforge_root.resolve(),
-                self.scratch_dir.resolve(),
-                Path.cwd().resolve()
-            ]
-
-            return any(
-                str(resolved_path).startswith(str(root))
-                for root in allowed_roots
-            )
+            resolved_path = os.path.join(str(path.resolve()), '')
+            return resolved_path.startswith(self._allowed_root_prefixes)
         except (OSError, ValueError):
             return False
 
     def _validate_inference_config(self, config) -> bool:
         """Validate inference configuration parameters."""
         try:
-            # Validate numeric parameters
-            if not (0.1 <= float(config.lora_weight) <= 2.0):
+            # Validate numeric parameters; values arrive already typed from the API models
+            if not (0.1 <= config.lora_weight <= 2.0):
                 return False
-            if not (256 <= int(config.test_dim) <= 2048):
+            if not (256 <= config.test_dim <= 2048):
                 return False
-            if not (1 <= int(config.batch_size) <= 16):
+            if not (1 <= config.batch_size <= 16):
                 return False
-            if not (10 <= int(config.num_inference_steps) <= 200):
+            if not (10 <= config.num_inference_steps <= 200):
                 return False
 
             # Validate string parameters
@@ -194,23 +391,19 @@ class CharForgeIntegration:
                 return False
 
             return True
-        except (ValueError, TypeError):
+        except TypeError:
+            # Missing or non-numeric values
             return False
 
     def _sanitize_prompt(self, prompt: str) -> str:
         """Sanitize prompt input while preserving readability."""
         # Remove potentially dangerous characters but keep normal punctuation
-        dangerous_chars = ['`', '$', '\\', ';', '|', '&', '>', '<']
-        sanitized = prompt
-        for char in dangerous_chars:
-            sanitized = sanitized.replace(char, '')
-        return sanitized.strip()[:2000]  # Limit length
+        return prompt.translate(PROMPT_STRIP_TABLE).strip()[:2000]  # Limit length
 
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename to prevent path traversal."""
         # Remove path separators and dangerous characters
-        safe_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-')
-        return ''.join(c for c in filename if c in safe_chars)[:100]
+        return UNSAFE_FILENAME_CHARS.sub('', filename)[:100]
 
     def _is_safe_filename(self, filename: str) -> bool:
         """Check if filename is safe."""
@@ -251,50 +444,17 @@ class CharForgeIntegration:
             "--pulidflux_images", str(int(config.pulidflux_images))
         ]
 
-        # Add model configuration
+        # Add model, MV Adapter, advanced training and ComfyUI options
         if config.model_config:
-            cmd.extend(["--base_model", config.model_config.base_model])
-            cmd.extend(["--vae_model", config.model_config.vae_model])
-            if config.model_config.unet_model:
-                cmd.extend(["--unet_model", config.model_config.unet_model])
-            cmd.extend(["--scheduler", config.model_config.scheduler])
-            cmd.extend(["--dtype", config.model_config.dtype])
-
-        # Add MV Adapter configuration
+            cmd += _option_args(config.model_config, MODEL_CONFIG_FLAGS)
         if config.mv_adapter_config and config.mv_adapter_config.enabled:
-            cmd.extend(["--use_mv_adapter"])
-            cmd.extend(["--adapter_path", config.mv_adapter_config.adapter_path])
-            cmd.extend(["--num_views", str(config.mv_adapter_config.num_views)])
-            cmd.extend(["--mv_height", str(config.mv_adapter_config.height)])
-            cmd.extend(["--mv_width", str(config.mv_adapter_config.width)])
-            cmd.extend(["--guidance_scale", str(config.mv_adapter_config.guidance_scale)])
-            cmd.extend(["--reference_conditioning_scale", str(config.mv_adapter_config.reference_conditioning_scale)])
-            cmd.extend(["--azimuth_degrees", ",".join(map(str, config.mv_adapter_config.azimuth_degrees))])
-            if config.mv_adapter_config.remove_background:
-                cmd.extend(["--remove_background"])
-
-        # Add advanced training configuration
+            cmd += _option_args(config.mv_adapter_config, MV_ADAPTER_FLAGS)
+            cmd += ["--adapter_path", config.model_config.adapter_path]
+            cmd += ["--azimuth_degrees", ",".join(map(str, config.mv_adapter_config.azimuth_degrees))]
         if config.advanced_config:
-            cmd.extend(["--optimizer", config.advanced_config.optimizer])
-            cmd.extend(["--weight_decay", str(config.advanced_config.weight_decay)])
-            cmd.extend(["--lr_scheduler", config.advanced_config.lr_scheduler])
-            cmd.extend(["--gradient_accumulation", str(config.advanced_config.gradient_accumulation)])
-            cmd.extend(["--mixed_precision", config.advanced_config.mixed_precision])
-            cmd.extend(["--save_every", str(config.advanced_config.save_every)])
-            cmd.extend(["--max_saves", str(config.advanced_config.max_saves)])
-
-            if config.advanced_config.gradient_checkpointing:
-                cmd.extend(["--gradient_checkpointing"])
-            if config.advanced_config.train_text_encoder:
-                cmd.extend(["--train_text_encoder"])
-
-        # Add ComfyUI model paths (these will be copied to standard names)
-        if config.comfyui_checkpoint:
-            cmd.extend(["--comfyui_checkpoint", config.comfyui_checkpoint])
-        if config.comfyui_vae:
-            cmd.extend(["--comfyui_vae", config.comfyui_vae])
-        if config.comfyui_lora:
-            cmd.extend(["--comfyui_lora", config.comfyui_lora])
+            cmd += _option_args(config.advanced_config, ADVANCED_TRAINING_FLAGS)
+        # ComfyUI model paths are copied to standard names by the script
+        cmd += _option_args(config, COMFYUI_MODEL_FLAGS)
 
         if config.work_dir:
             # Validate and sanitize work directory path
@@ -307,46 +467,66 @@ class CharForgeIntegration:
                 }
             cmd.extend(["--work_dir", str(work_dir)])
         
+        work_dir = str(work_dir) if config.work_dir else str(self.scratch_dir / config.name)
+        log_path = os.path.join(work_dir, TRAINING_LOG_NAME)
+
         # Run the process
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                env=env,
-                cwd=str(self.charforge_root)
-            )
-            
-            output_lines = []
-            while True:
-                line = await process.stdout.readline()
-                if not line:
-                    break
-                
-                line_str = line.decode().strip()
+            os.makedirs(work_dir, exist_ok=True)
+            log_file = open(log_path, "w", encoding="utf-8", buffering=TRAINING_LOG_BUFFER_SIZE)
+        except OSError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": ""
+            }
+
+        try:
+            output_lines = deque(maxlen=TRAINING_OUTPUT_TAIL_LINES)
+
+            def handle_line(line_str: str):
                 output_lines.append(line_str)
-                
+                log_file.write(line_str)
+                log_file.write("\n")
+
                 # Parse progress if callback provided
                 if progress_callback:
                     progress = self._parse_training_progress(line_str)
                     if progress is not None:
                         progress_callback(progress, line_str)
-            
-            await process.wait()
+
+            returncode = None
+            if settings.TRAINING_WORKER:
+                try:
+                    returncode = await self.training_worker.run(cmd[2:], env, handle_line)
+                except OSError:
+                    returncode = None  # Worker unavailable, use a one-off subprocess
+
+            # Also taken when the worker was started with another HF_HOME
+            if returncode is None:
+                process, read_fd = await self._spawn_process(cmd, env)
+                async for lines in self._iter_output_batches(read_fd):
+                    for line_str in lines:
+                        handle_line(line_str)
+                returncode = await process.wait()
             
             return {
-                "success": process.returncode == 0,
-                "returncode": process.returncode,
+                "success": returncode == 0,
+                "returncode": returncode,
                 "output": "\n".join(output_lines),
-                "work_dir": config.work_dir or str(self.scratch_dir / config.name)
+                "log_path": log_path,
+                "work_dir": work_dir
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "output": ""
+                "output": "\n".join(output_lines),
+                "log_path": log_path
             }
+        finally:
+            log_file.close()
     
     async def run_inference(
         self,
@@ -408,22 +588,11 @@ class CharForgeIntegration:
         
         # Run the process
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                env=env,
-                cwd=str(self.charforge_root)
-            )
+            process, read_fd = await self._spawn_process(cmd, env)
             
             output_lines = []
-            while True:
-                line = await process.stdout.readline()
-                if not line:
-                    break
-                
-                line_str = line.decode().strip()
-                output_lines.append(line_str)
+            async for lines in self._iter_output_batches(read_fd):
+                output_lines.extend(lines)
             
             await process.wait()
             
@@ -445,32 +614,63 @@ class CharForgeIntegration:
                 "output_files": []
             }
     
+    async def _spawn_process(self, cmd: List[str], env: Dict[str, str]):
+        """Start a CharForge script with stdout and stderr on a pipe we drain ourselves."""
+        read_fd, write_fd = os.pipe()
+        try:
+            # Keep the spawn eligible for CPython's vfork fast path: no preexec_fn,
+            # pass_fds, start_new_session or uid/gid changes. The scripts resolve
+            # ./weights and similar paths against cwd, so posix_spawn is not an option.
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=write_fd,
+                stderr=asyncio.subprocess.STDOUT,
+                env=env,
+                cwd=str(self.charforge_root),
+                close_fds=True
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        return process, read_fd
+
+    async def _iter_output_batches(self, read_fd: int):
+        """Yield lists of decoded, stripped output lines, one list per chunk read from the pipe."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = loop.run_in_executor(None, _drain_pipe, read_fd, loop, queue)
+        while True:
+            lines = await queue.get()
+            if lines is None:
+                break
+            yield lines
+        await reader
+
     def _parse_training_progress(self, line: str) -> Optional[float]:
         """Parse training progress from output line."""
-        # Look for progress indicators in the output
-        # This is a simplified version - you might need to adjust based on actual output
-        if "Step" in line and "/" in line:
-            try:
-                # Extract step numbers like "Step 100/800"
-                parts = line.split()
-                for i, part in enumerate(parts):
-                    if part == "Step" and i + 1 < len(parts):
-                        step_info = parts[i + 1]
-                        if "/" in step_info:
-                            current, total = step_info.split("/")
-                            return float(current) / float(total) * 100
-            except:
-                pass
-        return None
+        # Most lines carry no progress; a substring test is cheaper than a failed regex scan
+        if "Step" not in line:
+            return None
+        match = STEP_PATTERN.search(line)
+        if match is None:
+            return None
+        total = int(match.group(2))
+        if total == 0:
+            return None
+        return int(match.group(1)) / total * 100
     
     def _parse_inference_output(self, output_lines: List[str], config: InferenceConfig) -> List[str]:
         """Parse inference output to extract generated file paths."""
         output_files = []
         for line in output_lines:
-            if "Saved image to:" in line:
-                # Extract file path from line like "✅ Saved image to: /path/to/file.jpg"
-                path = line.split("Saved image to:")[-1].strip()
-                output_files.append(path)
+            if "Saved image to:" not in line:
+                continue
+            match = SAVED_IMAGE_PATTERN.search(line)
+            if match:
+                # Lines arrive stripped, so the path has no trailing whitespace
+                output_files.append(match.group(1))
         return output_files
     
     def get_character_info(self, character_name: str, work_dir: str = None) -> Dict[str, any]:
@@ -480,40 +680,69 @@ class CharForgeIntegration:
         else:
             work_dir = Path(work_dir)
         
+        work_dir = str(work_dir)
+        lora_dir = os.path.join(work_dir, "char")
+        sheet_dir = os.path.join(work_dir, "sheet")
+
+        # Adding or removing the LoRA or sheet images touches one of these directories
+        signature = (character_name, _mtime_ns(work_dir), _mtime_ns(lora_dir), _mtime_ns(sheet_dir))
+        cached = self._character_info_cache.get(work_dir)
+        if cached is not None and cached[0] == signature:
+            self._character_info_cache.move_to_end(work_dir)
+            info = cached[1]
+            return {**info, "sheet_images": list(info["sheet_images"])}
+        
         info = {
             "name": character_name,
-            "exists": work_dir.exists(),
-            "work_dir": str(work_dir),
+            "exists": signature[1] is not None,
+            "work_dir": work_dir,
             "has_lora": False,
             "has_sheet": False,
             "sheet_images": [],
             "lora_path": None
         }
         
-        if work_dir.exists():
+        if info["exists"]:
             # Check for LoRA
-            lora_dir = work_dir / "char"
-            lora_file = lora_dir / "char.safetensors"
-            if lora_file.exists():
+            lora_file = os.path.join(lora_dir, "char.safetensors")
+            if signature[2] is not None and os.path.isfile(lora_file):
                 info["has_lora"] = True
-                info["lora_path"] = str(lora_file)
+                info["lora_path"] = lora_file
             
             # Check for character sheet
-            sheet_dir = work_dir / "sheet"
-            if sheet_dir.exists():
+            if signature[3] is not None:
                 info["has_sheet"] = True
-                # Get sheet images
-                for ext in ["*.png", "*.jpg", "*.jpeg"]:
-                    info["sheet_images"].extend([str(p) for p in sheet_dir.glob(ext)])
+                # Get sheet images in a single directory read
+                with os.scandir(sheet_dir) as entries:
+                    info["sheet_images"] = [
+                        entry.path for entry in entries
+                        if entry.name.endswith(SHEET_IMAGE_SUFFIXES)
+                    ]
         
-        return info
+        self._character_info_cache[work_dir] = (signature, info)
+        self._character_info_cache.move_to_end(work_dir)
+        if len(self._character_info_cache) > CHARACTER_INFO_CACHE_SIZE:
+            self._character_info_cache.popitem(last=False)
+        return {**info, "sheet_images": list(info["sheet_images"])}
     
     def list_characters(self) -> List[Dict[str, any]]:
         """List all available characters."""
-        characters = []
-        if self.scratch_dir.exists():
-            for char_dir in self.scratch_dir.iterdir():
-                if char_dir.is_dir():
-                    char_info = self.get_character_info(char_dir.name, str(char_dir))
-                    characters.append(char_info)
-        return characters
+        scratch_mtime = _mtime_ns(self.scratch_dir)
+        if scratch_mtime is None:
+            return []
+        if scratch_mtime != self._character_dirs_mtime:
+            with os.scandir(self.scratch_dir) as entries:
+                self._character_dirs = [
+                    (entry.name, entry.path) for entry in entries
+                    if entry.is_dir()
+                ]
+            self._character_dirs_mtime = scratch_mtime
+        return [
+            self.get_character_info(name, path)
+            for name, path in self._character_dirs
+        ]
+
+@lru_cache(maxsize=1)
+def get_charforge() -> CharForgeIntegration:
+    """Return the process-wide CharForgeIntegration, so its caches and training worker are shared."""
+    return CharForgeIntegration()
@@ -1,106 +1,143 @@
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 import yaml
 from app.core.config import settings
 from app.core.database import Dataset, DatasetImage
 
+# libyaml's C loader when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Folders read in parallel during import
+IMPORT_WORKERS = 8
+
+IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg'})
+
+def _scan_sheet(sheet_dir: str):
+    """Return the image filenames and caption file stems of a sheet directory in one scandir pass."""
+    image_files = []
+    caption_stems = set()
+    with os.scandir(sheet_dir) as it:
+        for entry in it:
+            stem, sep, ext = entry.name.rpartition('.')
+            if not sep:
+                continue
+            if ext.lower() in IMAGE_EXTENSIONS:
+                if entry.is_file():
+                    image_files.append(entry.name)
+            elif ext == 'txt' and entry.is_file():
+                caption_stems.add(stem)
+    return image_files, caption_stems
+
+def _prepare_import(folder_path: str):
+    """Read one scratch folder into a dataset row and its image rows, or None if it is not a dataset."""
+    folder_name = os.path.basename(folder_path)
+    
+    # Check if this folder has dataset structure
+    sheet_dir = os.path.join(folder_path, "sheet")
+    config_file = os.path.join(folder_path, "config.yaml")
+    
+    if not os.path.isdir(sheet_dir) or not os.path.isfile(config_file):
+        return None
+        
+    # Parse config.yaml to get trigger word and other info
+    try:
+        with open(config_file, 'rb') as f:
+            config = yaml.load(f, Loader=YamlLoader)
+            
+            # Extract trigger word from datasets config
+            trigger_word = ""
+            if 'config' in config and 'datasets' in config['config'] and len(config['config']['datasets']) > 0:
+                # This is a bit of a guess based on the structure we saw earlier
+                trigger_word = config['config']['datasets'][0].get('trigger_word', folder_name)
+    except Exception as e:
+        print(f"Error parsing config for {folder_name}: {e}")
+        trigger_word = folder_name
+        
+    # Collect images and caption files in sheet directory
+    image_files, caption_stems = _scan_sheet(sheet_dir)
+    
+    dataset_row = {
+        "name": folder_name,
+        "trigger_word": trigger_word,
+        "caption_template": "a photo of {trigger} person",
+        "auto_caption": True,
+        "resize_images": True,
+        "crop_images": True,
+        "flip_images": False,
+        "quality_filter": "basic",
+        "image_count": len(image_files),
+        "status": "ready"
+    }
+    
+    image_rows = []
+    for file in image_files:
+        # Check if there's a corresponding caption file
+        caption = None
+        stem = file.rpartition('.')[0]
+        if stem in caption_stems:
+            try:
+                with open(os.path.join(sheet_dir, stem + '.txt'), 'r', encoding='utf-8') as f:
+                    caption = f.read().strip()
+            except:
+                pass
+        
+        image_rows.append({
+            "filename": file,
+            "original_filename": file,
+            "caption": caption,
+            "processed": True
+        })
+    
+    return dataset_row, image_rows
+
 def import_datasets_from_scratch(db: Session, user_id: int):
     """Import existing datasets from the scratch folder."""
-    import yaml
     
     scratch_dir = settings.CHARFORGE_SCRATCH_DIR
     if not scratch_dir.exists():
         return []
     
-    imported_datasets = []
+    # Skip folders that are already imported, using one query for all of them
+    existing_names = {
+        name for (name,) in db.query(Dataset.name).filter(Dataset.user_id == user_id)
+    }
     
     # Scan each folder in the scratch directory
-    for folder_name in os.listdir(scratch_dir):
-        folder_path = scratch_dir / folder_name
-        if not folder_path.is_dir():
-            continue
-            
-        # Check if this folder has dataset structure
-        sheet_dir = folder_path / "sheet"
-        config_file = folder_path / "config.yaml"
-        
-        if not sheet_dir.exists() or not config_file.exists():
-            continue
-            
-        # Check if dataset already exists in database
-        existing_dataset = db.query(Dataset).filter(
-            Dataset.name == folder_name,
-            Dataset.user_id == user_id
-        ).first()
+    with os.scandir(scratch_dir) as it:
+        folders = [
+            entry.path for entry in it
+            if entry.is_dir() and entry.name not in existing_names
+        ]
+    
+    if not folders:
+        return []
+    
+    # Config parsing and directory scans are I/O bound, so read folders concurrently
+    with ThreadPoolExecutor(max_workers=min(IMPORT_WORKERS, len(folders))) as executor:
+        prepared = [result for result in executor.map(_prepare_import, folders) if result]
+    
+    imported_datasets = []
+    image_rows = []
+    try:
+        for dataset_row, rows in prepared:
+            dataset = Dataset(user_id=user_id, **dataset_row)
+            db.add(dataset)
+            imported_datasets.append((dataset, rows))
         
-        if existing_dataset:
-            continue
-            
-        # Parse config.yaml to get trigger word and other info
-        try:
-            with open(config_file, 'r') as f:
-                config = yaml.safe_load(f)
-                
-                # Extract trigger word from datasets config
-                trigger_word = ""
-                if 'config' in config and 'datasets' in config['config'] and len(config['config']['datasets']) > 0:
-                    # This is a bit of a guess based on the structure we saw earlier
-                    trigger_word = config['config']['datasets'][0].get('trigger_word', folder_name)
-        except Exception as e:
-            print(f"Error parsing config for {folder_name}: {e}")
-            trigger_word = folder_name
-            
-        # Count images in sheet directory
-        image_count = 0
-        for file in os.listdir(sheet_dir):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                image_count += 1
-                
-        # Create dataset record
-        dataset = Dataset(
-            user_id=user_id,
-            name=folder_name,
-            trigger_word=trigger_word,
-            caption_template="a photo of {trigger} person",
-            auto_caption=True,
-            resize_images=True,
-            crop_images=True,
-            flip_images=False,
-            quality_filter="basic",
-            image_count=image_count,
-            status="ready",
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        db.add(dataset)
-        db.commit()
-        db.refresh(dataset)
+        # One flush assigns every dataset id; images then go in a single bulk insert
+        db.flush()
+        for dataset, rows in imported_datasets:
+            for row in rows:
+                row["dataset_id"] = dataset.id
+            image_rows.extend(rows)
+        db.bulk_insert_mappings(DatasetImage, image_rows)
         
-        # Create dataset image records
-        for file in os.listdir(sheet_dir):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                # Check if there's a corresponding caption file
-                caption = None
-                caption_file = sheet_dir / f"{os.path.splitext(file)[0]}.txt"
-                if caption_file.exists():
-                    try:
-                        with open(caption_file, 'r') as f:
-                            caption = f.read().strip()
-                    except:
-                        pass
-                
-                dataset_image = DatasetImage(
-                    dataset_id=dataset.id,
-                    filename=file,
-                    original_filename=file,
-                    caption=caption,
-                    processed=True,
-                    created_at=datetime.utcnow()
-                )
-                db.add(dataset_image)
-                
+        # A single commit (one SQLite fsync) for the whole import
         db.commit()
-        imported_datasets.append(dataset)
-        
-    return imported_datasets
\ No newline at end of file
+    except Exception:
+        # Leave no half-imported datasets behind
+        db.rollback()
+        raise
+    
+    return [dataset for dataset, _ in imported_datasets]
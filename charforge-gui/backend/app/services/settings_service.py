@@ -3,9 +3,13 @@ from typing import Dict, Optional
 import base64
 from cryptography.fernet import Fernet
 import os
+from functools import lru_cache
 
 from app.core.database import AppSettings
 
+# Settings forwarded to CharForge as environment variables
+ENV_VAR_KEYS = ('HF_TOKEN', 'HF_HOME', 'CIVITAI_API_KEY', 'GOOGLE_API_KEY', 'FAL_KEY')
+
 # Simple encryption for sensitive settings
 def get_encryption_key():
     """Get or create encryption key for sensitive settings."""
@@ -28,16 +32,20 @@ def get_encryption_key():
         print("WARNING: Generated new encryption key. Set ENCRYPTION_KEY environment variable for production.")
         return key
 
-ENCRYPTION_KEY = get_encryption_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+@lru_cache(maxsize=1)
+def get_cipher_suite() -> Fernet:
+    """Load the encryption key on first use rather than at import time."""
+    return Fernet(get_encryption_key())
 
 def encrypt_value(value: str) -> str:
     """Encrypt a sensitive value."""
-    return cipher_suite.encrypt(value.encode()).decode()
+    return get_cipher_suite().encrypt(value.encode()).decode()
 
+# A ciphertext always decrypts to the same value, so results can be cached by ciphertext
+@lru_cache(maxsize=1024)
 def decrypt_value(encrypted_value: str) -> str:
     """Decrypt a sensitive value."""
-    return cipher_suite.decrypt(encrypted_value.encode()).decode()
+    return get_cipher_suite().decrypt(encrypted_value.encode()).decode()
 
 async def save_user_setting(
     user_id: int,
@@ -112,15 +120,14 @@ async def get_user_settings(user_id: int, db: Session) -> Dict[str, str]:
 async def get_user_env_vars(user_id: int, db: Session) -> Dict[str, str]:
     """Get environment variables for CharForge from user settings."""
     
-    settings = await get_user_settings(user_id, db)
+    rows = db.query(AppSettings.key, AppSettings.value, AppSettings.is_encrypted).filter(
+        AppSettings.user_id == user_id,
+        AppSettings.key.in_(ENV_VAR_KEYS)
+    ).all()
     
-    env_vars = {
-        'HF_TOKEN': settings.get('HF_TOKEN', ''),
-        'HF_HOME': settings.get('HF_HOME', ''),
-        'CIVITAI_API_KEY': settings.get('CIVITAI_API_KEY', ''),
-        'GOOGLE_API_KEY': settings.get('GOOGLE_API_KEY', ''),
-        'FAL_KEY': settings.get('FAL_KEY', ''),
-    }
+    env_vars = dict.fromkeys(ENV_VAR_KEYS, '')
+    for key, value, is_encrypted in rows:
+        env_vars[key] = decrypt_value(value) if is_encrypted else value
     
     return env_vars
 
@@ -0,0 +1,27 @@
+"""Add app_settings lookup index
+
+This migration adds a composite (user_id, key) index to app_settings,
+which every settings read, save and delete filters on.
+"""
+
+from sqlalchemy import text
+from app.core.database import engine
+
+def upgrade():
+    """Add app_settings index."""
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_app_settings_user_key ON app_settings (user_id, key)"
+        ))
+        conn.commit()
+        print("App settings index created successfully!")
+
+def downgrade():
+    """Remove app_settings index."""
+    with engine.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_app_settings_user_key"))
+        conn.commit()
+        print("App settings index removed successfully!")
+
+if __name__ == "__main__":
+    upgrade()
@@ -44,12 +44,22 @@ def upgrade():
             )
         """))
         
+        # Indexes for per-user dataset lookups and per-dataset image lookups
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_datasets_user_name ON datasets (user_id, name)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_dataset_images_dataset_id ON dataset_images (dataset_id)"
+        ))
+        
         conn.commit()
         print("Dataset tables created successfully!")
 
 def downgrade():
     """Remove dataset tables."""
     with engine.connect() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_dataset_images_dataset_id"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_datasets_user_name"))
         conn.execute(text("DROP TABLE IF EXISTS dataset_images"))
         conn.execute(text("DROP TABLE IF EXISTS datasets"))
         conn.commit()
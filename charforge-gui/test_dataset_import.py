@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the scratch dataset import.
+This script checks which sheet files the importer picks up as images.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+def test_sheet_image_listing():
+    """Test which sheet directory entries are listed as images and captions."""
+    print("🧪 Testing sheet image listing...")
+
+    from app.services.dataset_import import _scan_sheet
+
+    with tempfile.TemporaryDirectory() as sheet_dir:
+        for name in ["front.png", "SIDE.JPG", "back.jpeg", "png", "front.txt"]:
+            Path(sheet_dir, name).touch()
+        # A directory with an image-like name is not an image
+        os.mkdir(os.path.join(sheet_dir, "folder.png"))
+        # Symlinked images and captions are imported like regular files
+        os.symlink(os.path.join(sheet_dir, "front.png"), os.path.join(sheet_dir, "linked.png"))
+        os.symlink(os.path.join(sheet_dir, "front.txt"), os.path.join(sheet_dir, "linked.txt"))
+
+        image_files, caption_stems = _scan_sheet(sheet_dir)
+
+    expected = {"front.png", "SIDE.JPG", "back.jpeg", "linked.png"}
+
+    if set(image_files) == expected:
+        print("  ✅ Dotless names skipped, symlinks and uppercase extensions listed")
+    else:
+        print(f"  ❌ Listed {sorted(image_files)} (expected {sorted(expected)})")
+        return False
+
+    if caption_stems == {"front", "linked"}:
+        print("  ✅ Caption files and symlinked captions found")
+    else:
+        print(f"  ❌ Found captions {sorted(caption_stems)} (expected ['front', 'linked'])")
+        return False
+
+    print("  ✅ All sheet listing tests passed!")
+    return True
+
+def main():
+    """Run all tests."""
+    print("🚀 Testing Scratch Dataset Import")
+    print("=" * 50)
+
+    tests = [
+        test_sheet_image_listing,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"  ❌ Test failed with exception: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All tests passed! Dataset import is working correctly.")
+        return 0
+    else:
+        print("❌ Some tests failed. Please check the implementation.")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -65,6 +65,7 @@ def test_config_endpoint_response():
     """Test the auth config endpoint response format."""
     print("\n🧪 Testing auth config endpoint response format...")
     
+    loop = None
     try:
         from app.api.auth import get_auth_config
         from app.core.config import settings
@@ -78,7 +79,8 @@ def test_config_endpoint_response():
         settings.ALLOW_REGISTRATION = False
         
         import asyncio
-        response = asyncio.run(get_auth_config())
+        loop = asyncio.new_event_loop()
+        response = loop.run_until_complete(get_auth_config())
         
         expected = {
             "auth_enabled": False,
@@ -95,7 +97,7 @@ def test_config_endpoint_response():
         settings.ENABLE_AUTH = True
         settings.ALLOW_REGISTRATION = True
         
-        response = asyncio.run(get_auth_config())
+        response = loop.run_until_complete(get_auth_config())
         
         expected = {
             "auth_enabled": True,
@@ -118,6 +120,10 @@ def test_config_endpoint_response():
     except Exception as e:
         print(f"  ❌ Config endpoint test failed: {e}")
         return False
+    
+    finally:
+        if loop is not None:
+            loop.close()
 
 def test_environment_variables():
     """Test environment variable configuration."""
@@ -2,26 +2,62 @@ import os
 import subprocess
 
 
+# Subprocess output is read in chunks of this size
+STREAM_READ_SIZE = 64 * 1024
+
+# Base paths from the APP_PATH environment variable, falling back to the startup directory
+APP_PATH = SCRATCH_DIR = LORACAPTIONER_DIR = None
+
+
+def refresh_paths():
+    """Re-read APP_PATH, e.g. after changing it in the environment."""
+    global APP_PATH, SCRATCH_DIR, LORACAPTIONER_DIR
+    APP_PATH = os.environ.get('APP_PATH', os.getcwd())
+    SCRATCH_DIR = os.path.join(APP_PATH, 'scratch')
+    LORACAPTIONER_DIR = os.path.join(APP_PATH, 'LoRACaptioner')
+
+
+refresh_paths()
+
+
 def run_subprocess(cmd, work_dir=None):
-    """Run a subprocess command and return its output."""
+    """Run a subprocess command, echoing its output as it arrives, and return the output."""
     print(f"Running: {' '.join(cmd)}")
     try:
         process = subprocess.Popen(
             cmd,
             cwd=work_dir,
-            text=True,
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            bufsize=1,
-            universal_newlines=True
+            stderr=subprocess.STDOUT
         )
 
+        # Read in large chunks and split lines ourselves rather than one readline per line
         output = []
-        for line in process.stdout:
-            line = line.rstrip()
-            print(line)
+        pending = b""
+        fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, STREAM_READ_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            # A trailing \r may be the first half of a \r\n split across reads, so hold it back
+            held = b""
+            if pending.endswith(b"\r"):
+                pending, held = pending[:-1], b"\r"
+            # Treat carriage returns (progress bars) as line breaks, as text mode did
+            pending = pending.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            *lines, pending = pending.split(b"\n")
+            pending += held
+            if lines:
+                lines = [line.decode(errors="replace").rstrip() for line in lines]
+                print("\n".join(lines), flush=True)
+                output.extend(lines)
+        if pending:
+            line = pending.rstrip(b"\r").decode(errors="replace").rstrip()
+            print(line, flush=True)
             output.append(line)
 
+        process.stdout.close()
         process.wait()
 
         if process.returncode != 0:
@@ -33,6 +69,23 @@ def run_subprocess(cmd, work_dir=None):
         raise
 
 
+def run_subprocess_capture(cmd, work_dir=None):
+    """Run a subprocess command without echoing it, returning its combined output in one read."""
+    print(f"Running: {' '.join(cmd)}")
+    result = subprocess.run(
+        cmd,
+        cwd=work_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+    if result.returncode != 0:
+        # The output was not streamed, so show it when something went wrong
+        print(result.stdout)
+        raise subprocess.CalledProcessError(result.returncode, cmd, output=result.stdout)
+    return result.stdout
+
+
 def find_character_lora(name, work_dir=None):
     """
     Find the LoRA model for a character.
@@ -46,24 +99,17 @@ def find_character_lora(name, work_dir=None):
     """
     # Set default work_dir if not provided
     if work_dir is None:
-        # Use the APP_PATH environment variable as the base path if available
-        app_path = os.environ.get('APP_PATH', os.getcwd())
-        work_dir = os.path.join(app_path, 'scratch', name)
+        work_dir = os.path.join(SCRATCH_DIR, name)
 
-    # Check if work_dir exists
-    if not os.path.exists(work_dir):
-        raise FileNotFoundError(f"Character directory not found: {work_dir}")
-
-    # Find LoRA directory
     lora_dir = os.path.join(work_dir, "char")
-    if not os.path.exists(lora_dir):
-        raise FileNotFoundError(f"LoRA directory not found: {lora_dir}")
-
-    # Look for specific LoRA file - char.safetensors
-    lora_file = "char.safetensors"
-    lora_path = os.path.join(lora_dir, lora_file)
-
-    if not os.path.exists(lora_path):
+    lora_path = os.path.join(lora_dir, "char.safetensors")
+
+    # Stat only the LoRA file on the happy path; walk up only to name what is missing
+    if not os.path.isfile(lora_path):
+        if not os.path.exists(work_dir):
+            raise FileNotFoundError(f"Character directory not found: {work_dir}")
+        if not os.path.exists(lora_dir):
+            raise FileNotFoundError(f"LoRA directory not found: {lora_dir}")
         raise FileNotFoundError(f"LoRA model file not found: {lora_path}")
 
     return lora_path
@@ -83,9 +129,7 @@ def optimize_prompt(user_prompt, character_name, use_reference_image, work_dir=N
         str: Optimized prompt
     """
     if work_dir is None:
-        # Use the APP_PATH environment variable as the base path if available
-        app_path = os.environ.get('APP_PATH', os.getcwd())
-        work_dir = os.path.join(app_path, 'scratch', character_name)
+        work_dir = os.path.join(SCRATCH_DIR, character_name)
 
     # Get captions directory (should be in the sheet folder)
     captions_dir = os.path.join(work_dir, "sheet")
@@ -98,8 +142,7 @@ def optimize_prompt(user_prompt, character_name, use_reference_image, work_dir=N
     captions_dir = os.path.abspath(captions_dir)
 
     # Find the LoRACaptioner directory using APP_PATH
-    app_path = os.environ.get('APP_PATH', os.getcwd())
-    loracaptioner_dir = os.path.join(app_path, "LoRACaptioner")
+    loracaptioner_dir = LORACAPTIONER_DIR
 
     if not os.path.exists(loracaptioner_dir):
         print(f"Warning: LoRACaptioner directory not found: {loracaptioner_dir}")
@@ -122,15 +165,16 @@ def optimize_prompt(user_prompt, character_name, use_reference_image, work_dir=N
 
     try:
         print(f"Optimizing prompt using LoRACaptioner...")
-        print(f"Running: {' '.join(cmd)} in {loracaptioner_dir}")
-        output = run_subprocess(cmd, loracaptioner_dir)
-
-        # Extract the optimized prompt from the output
-        lines = output.split('\n')
-        for i in range(len(lines)):
-            if "Optimized Prompt:" in lines[i] and i + 1 < len(lines):
-                optimized_prompt = lines[i + 1].strip()
-                return optimized_prompt
+        output = run_subprocess_capture(cmd, loracaptioner_dir)
+
+        # Extract the optimized prompt from the line after the marker
+        lines = iter(output.splitlines())
+        for line in lines:
+            if "Optimized Prompt:" in line:
+                optimized_prompt = next(lines, "").strip()
+                if optimized_prompt:
+                    return optimized_prompt
+                break
 
         # If we couldn't find the optimized prompt in the output
         print("Warning: Could not parse optimized prompt from output")
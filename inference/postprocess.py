@@ -1,8 +1,7 @@
 import os
+import threading
 from typing import Union, List
 
-from inference.workflows.face_enhance import initialize_models, face_enhance
-
 
 class FaceEnhancer:
     """
@@ -18,34 +17,43 @@ class FaceEnhancer:
         Loads and initializes all required models and resources for face enhancement.
         Call this before process().
         """
+        if self.prepared:
+            return
+        # Imported here so loading this module does not pull in the ComfyUI workflow
+        from inference.workflows.face_enhance import initialize_models
         initialize_models()
         self.prepared = True
 
     def process(
             self,
-            face_image: str,
+            face_image: Union[str, List[str]],
             input_image: Union[str, List[str]],
             output_image: Union[str, List[str]],
-            positive_prompt: str = "",
+            positive_prompt: Union[str, List[str]] = "",
             id_weight: float = 0.75,
             batch_size: int = 1,
             output_filenames: List[str] = None,
+            max_batch_size: int = None,
+            vae_slice_size: int = None,
     ):
         """
         Runs the face enhancement process. Call prepare() before this.
         Args:
-            face_image: Path to face image
+            face_image: Path to face image, or one path per input image
             input_image: Path or list of paths to input images
             output_image: Path or list of output image paths
-            positive_prompt: one prompt (no list)
+            positive_prompt: One prompt, or one prompt per input image
             id_weight: Weight for identity
-            batch_size: Number of images in batch
+            batch_size: Number of copies to enhance when input_image is a single path
             output_filenames: Optional list of output filenames
+            max_batch_size: Largest sampler batch (None = no limit)
+            vae_slice_size: Latents per VAE decode call (None = let ComfyUI decide)
         Returns:
             list[str]: List of filenames of the enhanced images
         """
         if not self.prepared:
             raise RuntimeError("Call prepare() before process().")
+        from inference.workflows.face_enhance import face_enhance
         return face_enhance(
             face_image=face_image,
             input_image=input_image,
@@ -54,4 +62,22 @@ class FaceEnhancer:
             id_weight=id_weight,
             batch_size=batch_size,
             output_filenames=output_filenames,
+            max_batch_size=max_batch_size,
+            vae_slice_size=vae_slice_size,
         )
+
+
+_face_enhancer = None
+_face_enhancer_lock = threading.Lock()
+
+
+def get_face_enhancer():
+    """Return the process-wide FaceEnhancer, loading its models on first use."""
+    global _face_enhancer
+    if _face_enhancer is None:
+        with _face_enhancer_lock:
+            if _face_enhancer is None:
+                enhancer = FaceEnhancer()
+                enhancer.prepare()
+                _face_enhancer = enhancer
+    return _face_enhancer
@@ -1,8 +1,13 @@
 import atexit
 import os
+import queue
 import random
 import sys
+import threading
+import time
 import torch
+from concurrent.futures import Future
+from torchvision.io import ImageReadMode, read_image
 from typing import Sequence, Mapping, Any, Union
 
 from install import COMFYUI_PATH
@@ -13,6 +18,13 @@ To avoid loading the models each time, we store them in a global variable.
 """
 COMFY_MODELS = None
 
+# Text encodings kept per prompt; the empty negative prompt is encoded once per process
+PROMPT_CACHE_SIZE = 32
+
+# face_enhance_queued waits this long for other callers' images before running a batch
+BATCH_WAIT_SECONDS = 0.02
+BATCH_MAX_JOBS = 4
+
 
 def get_value_at_index(obj: Union[Sequence, Mapping], index: int) -> Any:
     """Returns the value at the given index of a sequence or mapping.
@@ -40,28 +52,27 @@ def get_value_at_index(obj: Union[Sequence, Mapping], index: int) -> Any:
 
 def find_path(name: str, path: str = None) -> str:
     """
-    Recursively looks at parent folders starting from the given path until it finds the given name.
+    Looks at parent folders starting from the given path until it finds the given name.
     Returns the path as a Path object if found, or None otherwise.
     """
     # If no path is given, use the current working directory
     if path is None:
         path = os.getcwd()
 
-    # Check if the current directory contains the name
-    if name in os.listdir(path):
+    while True:
+        # One stat per directory instead of listing it
         path_name = os.path.join(path, name)
-        print(f"{name} found: {path_name}")
-        return path_name
+        if os.path.lexists(path_name):
+            print(f"{name} found: {path_name}")
+            return path_name
 
-    # Get the parent directory
-    parent_directory = os.path.dirname(path)
+        # Get the parent directory
+        parent_directory = os.path.dirname(path)
 
-    # If the parent directory is the same as the current directory, we've reached the root and stop the search
-    if parent_directory == path:
-        return None
-
-    # Recursively call the function with the parent directory
-    return find_path(name, parent_directory)
+        # If the parent directory is the same as the current directory, we've reached the root and stop the search
+        if parent_directory == path:
+            return None
+        path = parent_directory
 
 
 def add_comfyui_directory_to_sys_path() -> None:
@@ -118,21 +129,19 @@ def import_custom_nodes() -> None:
     init_extra_nodes()
 
 
-from nodes import (
-    LoadImage,
-    SaveImage,
-    NODE_CLASS_MAPPINGS,
-    CLIPTextEncode,
-    CheckpointLoaderSimple,
-    VAEEncode,
-    VAEDecode,
-    ControlNetLoader,
-    ControlNetApplyAdvanced,
-)
-
-
 @torch.inference_mode()
 def load_models():
+    # Imported here so importing this module does not pull in ComfyUI's node graph
+    from nodes import (
+        NODE_CLASS_MAPPINGS,
+        CLIPTextEncode,
+        CheckpointLoaderSimple,
+        VAEEncode,
+        VAEDecode,
+        ControlNetLoader,
+        ControlNetApplyAdvanced,
+    )
+
     checkpointloadersimple = CheckpointLoaderSimple()
     checkpoint = checkpointloadersimple.load_checkpoint(
         ckpt_name="flux1-dev-fp8.safetensors"
@@ -151,9 +160,54 @@ def load_models():
         provider="CUDA"
     )
 
-    controlnetloader = ControlNetLoader()
-    controlnetloader_49 = controlnetloader.load_controlnet(
-        control_net_name="Flux_Dev_ControlNet_Union_Pro_ShakkerLabs.safetensors"
+    # The VAE is all convolutions; NHWC weights let cuDNN use its tensor-core kernels, and
+    # ComfyUI's NHWC images reach it as channels-last views already
+    vae_model = get_value_at_index(checkpoint, 2).first_stage_model
+    vae_model.to(memory_format=torch.channels_last)
+
+    # Opt-in, like the safety checker: compiling costs more than a one-off CLI run saves
+    if os.environ.get("COMPILE_FACE_ENHANCE") == "1":
+        try:
+            vae_model.encode = torch.compile(vae_model.encode)
+            vae_model.decode = torch.compile(vae_model.decode)
+        except Exception as e:
+            print(f"torch.compile unavailable for the VAE, running eagerly: {e}")
+
+    controlnet_name = "Flux_Dev_ControlNet_Union_Pro_ShakkerLabs.safetensors"
+    if os.environ.get("FACE_ENHANCE_FP8_CONTROLNET", "1") == "1":
+        # Store the ControlNet in fp8 like the Flux checkpoint; ComfyUI upcasts each layer's
+        # weights as it runs, so this halves their memory and traffic
+        import comfy.controlnet
+        import folder_paths
+        controlnetloader_49 = (comfy.controlnet.load_controlnet(
+            folder_paths.get_full_path("controlnet", controlnet_name),
+            model_options={"dtype": torch.float8_e4m3fn},
+        ),)
+    else:
+        controlnetloader = ControlNetLoader()
+        controlnetloader_49 = controlnetloader.load_controlnet(
+            control_net_name=controlnet_name
+        )
+
+    # Node objects are reused across calls, as ComfyUI's executor does for a workflow's nodes
+    nodes = {
+        "cliptextencode": CLIPTextEncode(),
+        "vaeencode": VAEEncode(),
+        "vaedecode": VAEDecode(),
+        "applypulidflux": NODE_CLASS_MAPPINGS["ApplyPulidFlux"](),
+        "basicscheduler": NODE_CLASS_MAPPINGS["BasicScheduler"](),
+        "controlnetapplyadvanced": ControlNetApplyAdvanced(),
+        "basicguider": NODE_CLASS_MAPPINGS["BasicGuider"](),
+        "samplercustomadvanced": NODE_CLASS_MAPPINGS["SamplerCustomAdvanced"](),
+    }
+
+    # These outputs never change between calls
+    ksamplerselect = NODE_CLASS_MAPPINGS["KSamplerSelect"]()
+    ksamplerselect_50 = ksamplerselect.get_sampler(sampler_name="euler")
+
+    setunioncontrolnettype = NODE_CLASS_MAPPINGS["SetUnionControlNetType"]()
+    setunioncontrolnettype_41 = setunioncontrolnettype.set_controlnet_type(
+        type="tile", control_net=get_value_at_index(controlnetloader_49, 0)
     )
 
     return {
@@ -162,6 +216,15 @@ def load_models():
         "pulidfluxevacliploader_45": pulidfluxevacliploader_45,
         "pulidfluxinsightfaceloader_46": pulidfluxinsightfaceloader_46,
         "controlnetloader_49": controlnetloader_49,
+        "ksamplerselect_50": ksamplerselect_50,
+        "setunioncontrolnettype_41": setunioncontrolnettype_41,
+        "nodes": nodes,
+        # PuLID-patched model and sigmas for the last face, see main()
+        "identity": None,
+        # CLIPTextEncode outputs by prompt text, see _encode_prompt()
+        "prompts": {},
+        # Noise buffers by latent shape and dtype, see NoiseFromBuffer
+        "noise": {},
     }
 
 
@@ -180,91 +243,94 @@ def cleanup_models():
 atexit.register(cleanup_models)
 
 
-def initialize_models():
-    global COMFY_MODELS
-    if COMFY_MODELS is None:
-        import_custom_nodes()  # Ensure NODE_CLASS_MAPPINGS is initialized
-        COMFY_MODELS = load_models()
+_models_lock = threading.Lock()
 
 
-def main(
-        face_image: str,
-        input_image: str,
-        output_image: str,
-        positive_prompt: str = "",
-        id_weight: float = 0.75,
-        batch_size: int = 1,
-        output_filenames: list = None,
-):
-    """
-    Main function for face enhancement. Supports batch processing.
-    Args:
-        face_image: Path to face image
-        input_image: Path or list of paths to input images
-        output_image: Path or list of output image paths
-        positive_prompt: one prompt (no list)
-        id_weight: Weight for identity
-        batch_size: Number of images in batch
-        output_filenames: Optional list of output filenames
-    Returns:
-        list[str]: List of filenames of the enhanced images
-    """
+def initialize_models():
     global COMFY_MODELS
-    if COMFY_MODELS is None:
-        raise ValueError("Models must be initialized before calling main(). Call initialize_models() first.")
-    initialize_models()
-    with torch.inference_mode():
-        checkpoint = COMFY_MODELS["checkpoint"]
-        pulidfluxmodelloader_44 = COMFY_MODELS["pulidfluxmodelloader_44"]
-        pulidfluxevacliploader_45 = COMFY_MODELS["pulidfluxevacliploader_45"]
-        pulidfluxinsightfaceloader_46 = COMFY_MODELS["pulidfluxinsightfaceloader_46"]
-        controlnetloader_49 = COMFY_MODELS["controlnetloader_49"]
-
-        cliptextencode = CLIPTextEncode()
-
-        # Use LoadImageFromPath to load face image (single)
-        loader = LoadImageFromPath()
-        face_tensor = loader.load_image(face_image)[0]
-        # Input images (batch)
-        if isinstance(input_image, list):
-            input_imgs = [loader.load_image(path)[0] for path in input_image]
-            input_tensor = torch.cat(input_imgs, dim=0)
-        else:
-            input_tensor = loader.load_image(input_image)[0]
-            if batch_size > 1:
-                input_tensor = input_tensor.repeat(batch_size, 1, 1, 1)
-        # Output images
-        if isinstance(output_image, list):
-            output_images = output_image
-        else:
-            output_images = [output_image] * batch_size
+    if COMFY_MODELS is not None:
+        return
+    # Concurrent first callers (e.g. face_enhance_queued) must not load the weights twice
+    with _models_lock:
+        if COMFY_MODELS is None:
+            # Input sizes repeat across calls, so let cuDNN pick the fastest conv algorithms once,
+            # and let fp32 matmuls and convs use TF32 tensor cores
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            import_custom_nodes()  # Ensure NODE_CLASS_MAPPINGS is initialized
+            COMFY_MODELS = load_models()
+
+
+def _load_input_image(path: str):
+    """Load an input image as a [1, H, W, C] float tensor, on the GPU when there is one."""
+    try:
+        # Decode to uint8 and scale on the device rather than through a float32 numpy copy
+        image = read_image(path, ImageReadMode.RGB, apply_exif_orientation=True)
+    except RuntimeError:
+        # Formats torchvision cannot decode, and missing files, go through the ComfyUI loader;
+        # its tensor is moved to the same device so a mixed chunk can still be concatenated
+        image = LoadImageFromPath().load_image(path)[0]
+        return image.to("cuda") if torch.cuda.is_available() else image
+    if torch.cuda.is_available():
+        image = image.pin_memory().to("cuda", non_blocking=True)
+    return image.permute(1, 2, 0).unsqueeze(0).float().div_(255.0)
+
+
+class NoiseFromBuffer:
+    """
+    Drop-in for RandomNoise's noise object that draws into a buffer reused across calls.
 
-        vaeencode = VAEEncode()
-        vaeencode_35 = vaeencode.encode(
-            pixels=input_tensor,
-            vae=get_value_at_index(checkpoint, 2),
-        )
+    Uses the same seeded CPU generator as ComfyUI's prepare_noise, so a seed gives the
+    same noise either way.
+    """
 
-        randomnoise = NODE_CLASS_MAPPINGS["RandomNoise"]()
-        randomnoise_39 = randomnoise.get_noise(noise_seed=random.randint(1, 2 ** 64))
-        cliptextencode_23 = cliptextencode.encode(
-            text="", clip=get_value_at_index(checkpoint, 1)
-        )
-        cliptextencode_42 = cliptextencode.encode(
-            text=positive_prompt, clip=get_value_at_index(checkpoint, 1)
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def generate_noise(self, input_latent):
+        latent_image = input_latent["samples"]
+        if "batch_index" in input_latent:
+            import comfy.sample
+            return comfy.sample.prepare_noise(latent_image, self.seed, input_latent["batch_index"])
+
+        buffers = COMFY_MODELS["noise"]
+        key = (tuple(latent_image.shape), latent_image.dtype)
+        buffer = buffers.get(key)
+        if buffer is None:
+            buffer = torch.empty(latent_image.shape, dtype=latent_image.dtype)
+            buffers[key] = buffer
+        generator = torch.Generator().manual_seed(self.seed)
+        return torch.randn(latent_image.shape, generator=generator, out=buffer)
+
+
+def _encode_prompt(text: str):
+    """Return the CLIPTextEncode output for a prompt, encoding each distinct text once."""
+    prompts = COMFY_MODELS["prompts"]
+    encoded = prompts.get(text)
+    if encoded is None:
+        encoded = COMFY_MODELS["nodes"]["cliptextencode"].encode(
+            text=text, clip=get_value_at_index(COMFY_MODELS["checkpoint"], 1)
         )
+        if len(prompts) >= PROMPT_CACHE_SIZE:
+            del prompts[next(iter(prompts))]
+        prompts[text] = encoded
+    return encoded
+
+
+def _identity(face_image: str, id_weight: float):
+    """Return the PuLID-patched model and sigmas for a face, reusing the last ones if they match."""
+    # The identity-patched model and its sigmas depend only on the face and the weight,
+    # so keep them while the same character is enhanced and skip face analysis per call
+    identity_key = (face_image, os.path.getmtime(face_image), id_weight)
+    identity = COMFY_MODELS["identity"]
+    if identity is None or identity[0] != identity_key:
+        checkpoint = COMFY_MODELS["checkpoint"]
+        applypulidflux = COMFY_MODELS["nodes"]["applypulidflux"]
+        basicscheduler = COMFY_MODELS["nodes"]["basicscheduler"]
 
-        ksamplerselect = NODE_CLASS_MAPPINGS["KSamplerSelect"]()
-        ksamplerselect_50 = ksamplerselect.get_sampler(sampler_name="euler")
-
-        applypulidflux = NODE_CLASS_MAPPINGS["ApplyPulidFlux"]()
-        setunioncontrolnettype = NODE_CLASS_MAPPINGS["SetUnionControlNetType"]()
-        controlnetapplyadvanced = ControlNetApplyAdvanced()
-        basicguider = NODE_CLASS_MAPPINGS["BasicGuider"]()
-        basicscheduler = NODE_CLASS_MAPPINGS["BasicScheduler"]()
-        samplercustomadvanced = NODE_CLASS_MAPPINGS["SamplerCustomAdvanced"]()
-        vaedecode = VAEDecode()
-
+        # Use LoadImageFromPath to load face image (single)
+        face_tensor = LoadImageFromPath().load_image(face_image)[0]
         applypulidflux_133 = applypulidflux.apply_pulid_flux(
             weight=id_weight,
             start_at=0.10000000000000002,
@@ -275,64 +341,239 @@ def main(
             train_step=1000,
             use_gray=True,
             model=get_value_at_index(checkpoint, 0),
-            pulid_flux=get_value_at_index(pulidfluxmodelloader_44, 0),
-            eva_clip=get_value_at_index(pulidfluxevacliploader_45, 0),
-            face_analysis=get_value_at_index(pulidfluxinsightfaceloader_46, 0),
+            pulid_flux=get_value_at_index(COMFY_MODELS["pulidfluxmodelloader_44"], 0),
+            eva_clip=get_value_at_index(COMFY_MODELS["pulidfluxevacliploader_45"], 0),
+            face_analysis=get_value_at_index(COMFY_MODELS["pulidfluxinsightfaceloader_46"], 0),
             image=face_tensor,
             unique_id=1674270197144619516,
         )
 
-        setunioncontrolnettype_41 = setunioncontrolnettype.set_controlnet_type(
-            type="tile", control_net=get_value_at_index(controlnetloader_49, 0)
-        )
-
-        controlnetapplyadvanced_37 = controlnetapplyadvanced.apply_controlnet(
-            strength=1,
-            start_percent=0.1,
-            end_percent=0.8,
-            positive=get_value_at_index(cliptextencode_42, 0),
-            negative=get_value_at_index(cliptextencode_23, 0),
-            control_net=get_value_at_index(setunioncontrolnettype_41, 0),
-            image=input_tensor,
-            vae=get_value_at_index(checkpoint, 2),
-        )
-
-        basicguider_122 = basicguider.get_guider(
-            model=get_value_at_index(applypulidflux_133, 0),
-            conditioning=get_value_at_index(controlnetapplyadvanced_37, 0),
-        )
-
         basicscheduler_131 = basicscheduler.get_sigmas(
             scheduler="beta",
             steps=28,
             denoise=0.75,
             model=get_value_at_index(applypulidflux_133, 0),
         )
+        identity = (identity_key, applypulidflux_133, basicscheduler_131)
+        COMFY_MODELS["identity"] = identity
+    return identity[1], identity[2]
+
+
+def _enhance_batch(input_tensor, face_image: str, positive_prompt: str, id_weight: float,
+                   vae_slice_size: int = None):
+    """Run one sampler batch for images sharing a face and prompt; returns the decoded images."""
+    checkpoint = COMFY_MODELS["checkpoint"]
+    ksamplerselect_50 = COMFY_MODELS["ksamplerselect_50"]
+    setunioncontrolnettype_41 = COMFY_MODELS["setunioncontrolnettype_41"]
+    nodes = COMFY_MODELS["nodes"]
+
+    vaeencode = nodes["vaeencode"]
+    vaeencode_35 = vaeencode.encode(
+        pixels=input_tensor,
+        vae=get_value_at_index(checkpoint, 2),
+    )
 
-        samplercustomadvanced_1 = samplercustomadvanced.sample(
-            noise=get_value_at_index(randomnoise_39, 0),
-            guider=get_value_at_index(basicguider_122, 0),
-            sampler=get_value_at_index(ksamplerselect_50, 0),
-            sigmas=get_value_at_index(basicscheduler_131, 0),
-            latent_image=get_value_at_index(vaeencode_35, 0),
-        )
+    # Any 64-bit value is a valid seed; randint(1, 2 ** 64) could return one past the maximum
+    randomnoise_39 = (NoiseFromBuffer(random.getrandbits(64)),)
+    cliptextencode_23 = _encode_prompt("")
+    cliptextencode_42 = _encode_prompt(positive_prompt)
+
+    controlnetapplyadvanced = nodes["controlnetapplyadvanced"]
+    basicguider = nodes["basicguider"]
+    samplercustomadvanced = nodes["samplercustomadvanced"]
+    vaedecode = nodes["vaedecode"]
+
+    applypulidflux_133, basicscheduler_131 = _identity(face_image, id_weight)
+
+    controlnetapplyadvanced_37 = controlnetapplyadvanced.apply_controlnet(
+        strength=1,
+        start_percent=0.1,
+        end_percent=0.8,
+        positive=get_value_at_index(cliptextencode_42, 0),
+        negative=get_value_at_index(cliptextencode_23, 0),
+        control_net=get_value_at_index(setunioncontrolnettype_41, 0),
+        image=input_tensor,
+        vae=get_value_at_index(checkpoint, 2),
+    )
 
-        vaedecode_114 = vaedecode.decode(
-            samples=get_value_at_index(samplercustomadvanced_1, 0),
-            vae=get_value_at_index(checkpoint, 2),
-        )
+    basicguider_122 = basicguider.get_guider(
+        model=get_value_at_index(applypulidflux_133, 0),
+        conditioning=get_value_at_index(controlnetapplyadvanced_37, 0),
+    )
+
+    samplercustomadvanced_1 = samplercustomadvanced.sample(
+        noise=get_value_at_index(randomnoise_39, 0),
+        guider=get_value_at_index(basicguider_122, 0),
+        sampler=get_value_at_index(ksamplerselect_50, 0),
+        sigmas=get_value_at_index(basicscheduler_131, 0),
+        latent_image=get_value_at_index(vaeencode_35, 0),
+    )
+
+    if vae_slice_size:
+        # Decode a few latents at a time so the decoder's activations for the whole batch
+        # never have to fit in VRAM at once
+        latents = get_value_at_index(samplercustomadvanced_1, 0)["samples"]
+        return torch.cat([
+            get_value_at_index(vaedecode.decode(
+                samples={"samples": latent_slice},
+                vae=get_value_at_index(checkpoint, 2),
+            ), 0)
+            for latent_slice in latents.split(vae_slice_size)
+        ], dim=0)
+
+    vaedecode_114 = vaedecode.decode(
+        samples=get_value_at_index(samplercustomadvanced_1, 0),
+        vae=get_value_at_index(checkpoint, 2),
+    )
+    return get_value_at_index(vaedecode_114, 0)
+
+
+def main(
+        face_image: Union[str, list],
+        input_image: Union[str, list],
+        output_image: Union[str, list],
+        positive_prompt: Union[str, list] = "",
+        id_weight: float = 0.75,
+        batch_size: int = 1,
+        output_filenames: list = None,
+        max_batch_size: int = None,
+        vae_slice_size: int = None,
+):
+    """
+    Main function for face enhancement. Supports batch processing.
+    Args:
+        face_image: Path to face image, or one path per input image
+        input_image: Path or list of paths to input images
+        output_image: Path or list of output image paths
+        positive_prompt: One prompt, or one prompt per input image
+        id_weight: Weight for identity
+        batch_size: Number of copies to enhance when input_image is a single path
+        output_filenames: Optional list of output filenames
+        max_batch_size: Largest sampler batch; bigger groups are split to bound VRAM (None = no limit)
+        vae_slice_size: Latents per VAE decode call (None = let ComfyUI size the decode)
+    Returns:
+        list[str]: List of filenames of the enhanced images
+    """
+    initialize_models()
+    with torch.inference_mode():
+        # Input images (batch)
+        if isinstance(input_image, list):
+            input_images = input_image
+        else:
+            input_images = [input_image] * batch_size
+        # Output images
+        if isinstance(output_image, list):
+            output_images = output_image
+        else:
+            output_images = [output_image] * batch_size
         # Use output_filenames if provided, else output_images
         save_paths = output_filenames if output_filenames is not None else output_images
-        return save_comfy_images(get_value_at_index(vaedecode_114, 0), save_paths)
+
+        count = len(input_images)
+        faces = face_image if isinstance(face_image, list) else [face_image] * count
+        prompts = positive_prompt if isinstance(positive_prompt, list) else [positive_prompt] * count
+
+        # PuLID fuses every face it is given into one identity, so only images sharing a
+        # face and prompt can go through the sampler together; each group is one batch
+        groups = {}
+        for i, key in enumerate(zip(faces, prompts)):
+            groups.setdefault(key, []).append(i)
+
+        loaded = {}
+        for (face, prompt), indices in groups.items():
+            step = max_batch_size or len(indices)
+            for start in range(0, len(indices), step):
+                chunk = indices[start:start + step]
+                for i in chunk:
+                    if input_images[i] not in loaded:
+                        loaded[input_images[i]] = _load_input_image(input_images[i])
+                chunk_images = {input_images[i] for i in chunk}
+                if len(chunk_images) == 1:
+                    # Copies of one image share its memory; the nodes only read their input
+                    input_tensor = loaded[chunk_images.pop()].expand(len(chunk), -1, -1, -1)
+                else:
+                    input_tensor = torch.cat([loaded[input_images[i]] for i in chunk], dim=0)
+                images = _enhance_batch(input_tensor, face, prompt, id_weight, vae_slice_size)
+                save_comfy_images(images, [save_paths[i] for i in chunk])
+        return save_paths
 
 
 def face_enhance(face_image: Union[str, list], input_image: Union[str, list], output_image: Union[str, list],
                  positive_prompt: Union[str, list] = "", id_weight: float = 0.75, batch_size: int = 1,
-                 output_filenames: list = None):
+                 output_filenames: list = None, max_batch_size: int = None, vae_slice_size: int = None):
     """
     Runs the face enhancement pipeline and returns the list of enhanced image filenames.
     Returns:
         list[str]: List of filenames of the enhanced images
     """
     initialize_models()  # Ensure models are loaded
-    return main(face_image, input_image, output_image, positive_prompt, id_weight, batch_size, output_filenames)
+    return main(face_image, input_image, output_image, positive_prompt, id_weight, batch_size, output_filenames,
+                max_batch_size, vae_slice_size)
+
+
+class _EnhanceBatcher:
+    """Collects single-image jobs from concurrent callers into shared main() calls."""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def submit(self, face_image, input_image, output_image, positive_prompt, id_weight):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="face-enhance-batcher", daemon=True)
+                self.worker.start()
+        future = Future()
+        self.jobs.put((id_weight, face_image, input_image, output_image, positive_prompt, future))
+        return future.result()
+
+    def _run(self):
+        pending = []
+        while True:
+            if not pending:
+                pending.append(self.jobs.get())
+            deadline = time.monotonic() + BATCH_WAIT_SECONDS
+            while len(pending) < BATCH_MAX_JOBS:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(self.jobs.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            # main() takes one id_weight, so jobs with another weight wait for the next batch
+            id_weight = pending[0][0]
+            batch = [job for job in pending if job[0] == id_weight]
+            pending = [job for job in pending if job[0] != id_weight]
+            try:
+                main(
+                    face_image=[job[1] for job in batch],
+                    input_image=[job[2] for job in batch],
+                    output_image=[job[3] for job in batch],
+                    positive_prompt=[job[4] for job in batch],
+                    id_weight=id_weight,
+                    batch_size=len(batch),
+                )
+            except Exception as e:
+                for job in batch:
+                    job[5].set_exception(e)
+            else:
+                for job in batch:
+                    job[5].set_result(job[3])
+
+
+_batcher = _EnhanceBatcher()
+
+
+def face_enhance_queued(face_image: str, input_image: str, output_image: str, positive_prompt: str = "",
+                        id_weight: float = 0.75) -> str:
+    """
+    Enhances one image, sharing a sampler batch with other threads calling at the same time.
+    Blocks until the image is saved. Do not mix with direct face_enhance() calls in one process.
+    Returns:
+        str: Filename of the enhanced image
+    """
+    initialize_models()  # Ensure models are loaded
+    return _batcher.submit(face_image, input_image, output_image, positive_prompt, id_weight)
@@ -1,5 +1,7 @@
 import argparse
 import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,13 +16,28 @@ else:
     os.environ["COMFYUI_PATH"] = COMFYUI_PATH
 
     os.environ["UV_LINK_MODE"] = "copy"
-    os.environ["PIP_CACHE_DIR"] = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache/pip")
+    # Defaults to the repo's volume; point PIP_CACHE_DIR at a mounted volume to keep it across machines
+    os.environ.setdefault("PIP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache/pip"))
     os.makedirs(os.environ["PIP_CACHE_DIR"], exist_ok=True)
+    # uv also installs for `comfy node install`; share the same cache there
+    os.environ.setdefault("UV_CACHE_DIR", os.environ["PIP_CACHE_DIR"])
 
 print("ComfyUI path: ", COMFYUI_PATH)
 # for network volume
 os.environ["GIT_LFS_SKIP_SMUDGE"] = "1"
 
+# Model files downloaded at once; each download is network-bound
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", "8"))
+
+# Bytes per read for streamed HTTP downloads; larger reads mean fewer Python round trips per file
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
+
+# Submodules git fetches at once
+GIT_JOBS = 8
+
+# Custom node repositories cloned at once
+CLONE_WORKERS = 4
+
 
 def pip_install(platform, cmd):
     if platform == PLATFORM_SERVERLESS:
@@ -29,10 +46,11 @@ def pip_install(platform, cmd):
         return f"{cmd} --cache-dir {os.environ['PIP_CACHE_DIR']}"
 
 
-def run_cmd(command):
-    """Run a shell command"""
+def run_cmd(command, cwd=None):
+    """Run a shell command, in cwd if given"""
     print(f"🔄 Running: {command}")
-    exit_code = os.system(command)
+    # cwd is passed per command rather than via os.chdir so repos can be set up from threads
+    exit_code = subprocess.run(command, shell=True, cwd=cwd).returncode
     if exit_code != 0:
         print(f"❌ Command failed: {command} (Exit Code: {exit_code})")
         exit(1)
@@ -45,28 +63,41 @@ def install_dependencies():
     print("✅ Dependencies installed.")
 
 
-def install_git_repo(repo_url, install_path, requirements=False, submodules=False, platform=PLATFORM_HOSTED):
-    """Clone or update a git repository and handle its dependencies"""
-    original_dir = os.getcwd()
-
+def fetch_git_repo(repo_url, install_path, submodules=False):
+    """Clone or update a git repository without installing its dependencies"""
     if not os.path.exists(install_path) or not os.path.isdir(install_path) or not os.path.exists(
             os.path.join(install_path, ".git")):
         print(f"📂 Cloning {os.path.basename(install_path)}...")
-        run_cmd(f"git clone {repo_url} {install_path}")
+        # Only the working tree is used, so skip the history; a later `git pull` still fast-forwards
+        run_cmd(f"git clone --depth=1 --single-branch {repo_url} {install_path}")
     else:
         print(f"🔄 {os.path.basename(install_path)} exists. Checking for updates...")
 
-    # Change to repo directory and update
-    os.chdir(install_path)
-    run_cmd("git pull")
+    run_cmd("git pull", cwd=install_path)
 
     if submodules:
-        run_cmd("git submodule update --init --recursive")
+        run_cmd(f"git submodule update --init --recursive --jobs={GIT_JOBS}", cwd=install_path)
+
+
+def install_git_repo(repo_url, install_path, requirements=False, submodules=False, platform=PLATFORM_HOSTED,
+                     fetch=True):
+    """Clone or update a git repository and handle its dependencies"""
+    if fetch:
+        fetch_git_repo(repo_url, install_path, submodules)
+
     if requirements:
-        run_cmd(pip_install(platform, "uv pip install -r requirements.txt"))
+        run_cmd(pip_install(platform, "uv pip install -r requirements.txt"), cwd=install_path)
 
     print(f"✅ {os.path.basename(install_path)} installed and updated.")
-    os.chdir(original_dir)
+
+
+def install_requirement_files(requirement_files, platform=PLATFORM_HOSTED):
+    """Install several requirements files with one uv resolve"""
+    if not requirement_files:
+        return
+    # uv resolves the files together, so shared dependencies are resolved and fetched once
+    requirements_args = " ".join(f"-r {path}" for path in requirement_files)
+    run_cmd(pip_install(platform, f"uv pip install {requirements_args}"))
 
 
 def install_modules(platform=PLATFORM_HOSTED):
@@ -78,7 +109,7 @@ def install_modules(platform=PLATFORM_HOSTED):
         # For serverless, the submodule directories are already copied by Modal's add_local_dir
         # We just need to install their dependencies
         print("📦 Installing dependencies for pre-copied submodules...")
-        original_dir = os.getcwd()
+        requirement_files = []
 
         # Known submodule directories that should be present
         submodule_dirs = ["MV_Adapter", "ComfyUI_AutoCropFaces", "ComfyUI", "LoRACaptioner"]
@@ -92,25 +123,25 @@ def install_modules(platform=PLATFORM_HOSTED):
 
                 requirements_path = os.path.join(submodule_dir, "requirements.txt")
                 if os.path.exists(requirements_path):
-                    print(f"📦 Installing dependencies for {submodule_dir}...")
-                    os.chdir(submodule_dir)
-                    run_cmd(pip_install(platform, "uv pip install -r requirements.txt"))
-                    os.chdir(original_dir)
+                    print(f"📦 Collecting dependencies for {submodule_dir}...")
+                    requirement_files.append(requirements_path)
                 else:
                     print(f"ℹ️ No requirements.txt found for {submodule_dir}")
             else:
                 print(f"⚠️ Expected submodule directory not found: {submodule_dir}")
 
+        install_requirement_files(requirement_files, platform)
+
     else:
         print("📂 Initializing and updating git submodules...")
 
         # Initialize and update all submodules defined in .gitmodules to their latest versions
         run_cmd("git submodule init")
-        run_cmd("git submodule update --init --recursive --remote")
+        run_cmd(f"git submodule update --init --recursive --remote --depth=1 --jobs={GIT_JOBS}")
 
         # Install dependencies for each submodule
         print("📦 Installing dependencies for submodules...")
-        original_dir = os.getcwd()
+        requirement_files = []
 
         # Get list of submodules from .gitmodules
         with open(".gitmodules", "r") as f:
@@ -121,11 +152,12 @@ def install_modules(platform=PLATFORM_HOSTED):
                     if submodule_path == "ai_toolkit":
                         print(f"⏭️ Skipping dependencies for {submodule_path}...")
                         continue
-                    if os.path.exists(os.path.join(submodule_path, "requirements.txt")):
-                        print(f"📦 Installing dependencies for {submodule_path}...")
-                        os.chdir(submodule_path)
-                        run_cmd(pip_install(platform, "uv pip install -r requirements.txt"))
-                        os.chdir(original_dir)
+                    requirements_path = os.path.join(submodule_path, "requirements.txt")
+                    if os.path.exists(requirements_path):
+                        print(f"📦 Collecting dependencies for {submodule_path}...")
+                        requirement_files.append(requirements_path)
+
+        install_requirement_files(requirement_files, platform)
 
     # Make CLI wrapper scripts executable
     if os.path.exists("scripts"):
@@ -136,6 +168,13 @@ def install_modules(platform=PLATFORM_HOSTED):
 
 def download_huggingface_models(cache_models=True):
     """Download required models from Hugging Face."""
+    # hf_transfer splits each file into parallel ranged requests; the hub errors if the flag
+    # is set without the package, so only turn it on when it is installed
+    try:
+        import hf_transfer  # noqa: F401
+        os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+    except ImportError:
+        pass
     from huggingface_hub import hf_hub_download
     hf_models = [
         {"repo_id": "Comfy-Org/flux1-dev", "filename": "flux1-dev-fp8.safetensors", "folder": "checkpoints"},
@@ -153,7 +192,7 @@ def download_huggingface_models(cache_models=True):
         "Bingsu/adetailer": "face_yolov8m.pt",
     }
 
-    for model in hf_models:
+    def download(model):
         try:
             target_dir = os.path.join(COMFYUI_PATH, "models", model["folder"])
             os.makedirs(target_dir, exist_ok=True)
@@ -163,16 +202,16 @@ def download_huggingface_models(cache_models=True):
                 file_path = os.path.join(target_dir, model["filename"])
                 if os.path.exists(file_path):
                     print(f"✅ Already exists: {model['filename']}")
-                    continue
+                    return
                 import requests
                 print(f"⬇️ Downloading {model['filename']} from direct URL...")
                 with requests.get(model["url"], stream=True) as r:
                     r.raise_for_status()
                     with open(file_path, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192):
+                        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                             f.write(chunk)
                 print(f"✅ Downloaded: {model['filename']} to {file_path}")
-                continue
+                return
 
             # Use mapping if it exists, otherwise use original filename
             file_name_only = filename_mappings.get(model["repo_id"], os.path.basename(model["filename"]))
@@ -180,7 +219,7 @@ def download_huggingface_models(cache_models=True):
 
             if os.path.exists(target_path):
                 print(f"✅ Already exists: {file_name_only}")
-                continue
+                return
 
             if cache_models:
                 # Download to HF_HOME cache and create symlink
@@ -205,6 +244,10 @@ def download_huggingface_models(cache_models=True):
         except Exception as e:
             print(f"❌ Failed to download {model['filename']}: {e}")
 
+    # The files are independent, so fetch them side by side
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        list(pool.map(download, hf_models))
+
 
 def download_external_models(cache_models=True):
     """Download required models from CivitAI."""
@@ -229,14 +272,14 @@ def download_external_models(cache_models=True):
             "folder": "checkpoints", "filename": "photon.safetensors"},
     ]
 
-    for model in external_models:
+    def download(model):
         target_dir = os.path.join(COMFYUI_PATH, "models", model["folder"])
         os.makedirs(target_dir, exist_ok=True)
         file_path = os.path.join(target_dir, model["filename"])
 
         if os.path.exists(file_path):
             print(f"✅ Model already exists: {model['filename']}")
-            continue
+            return
 
         try:
             if cache_models:
@@ -248,7 +291,7 @@ def download_external_models(cache_models=True):
                     response = requests.get(model["url"], stream=True)
                     response.raise_for_status()
                     with open(cache_path, "wb") as f:
-                        for chunk in response.iter_content(chunk_size=8192):
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                             f.write(chunk)
 
                 # Create symlink from cache to target
@@ -260,24 +303,27 @@ def download_external_models(cache_models=True):
                 response = requests.get(model["url"], stream=True)
                 response.raise_for_status()
                 with open(file_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                         f.write(chunk)
                 print(f"✅ Downloaded: {model['filename']} directly to {target_dir}")
         except requests.RequestException as e:
             print(f"❌ Failed to download {model['filename']} from {model['url']}: {e}")
 
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        list(pool.map(download, external_models))
+
     download_and_extract_antelopev2()
 
 
 def download_and_extract_antelopev2():
     """Download and extract AntelopeV2 model for insightface."""
-    import zipfile, requests, shutil
+    import zipfile, requests, shutil, tempfile
 
     base_path = os.path.join(COMFYUI_PATH, "models", "insightface/models")
     model_target_path = os.path.join(base_path, "antelopev2")
     download_url = "https://huggingface.co/MonsterMMORPG/tools/resolve/main/antelopev2.zip"
-    zip_path = os.path.join(base_path, "antelopev2.zip")
-    temp_extract_path = os.path.join(base_path, "temp_antelopev2")
+    # The archive holds its files under this folder
+    archive_prefix = "antelopev2/"
 
     os.makedirs(base_path, exist_ok=True)
 
@@ -288,43 +334,45 @@ def download_and_extract_antelopev2():
 
         print(f"📥 Downloading AntelopeV2 model...")
         try:
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status()
-            with open(zip_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            print("✅ Download complete.")
-
-            # Create a temporary extraction directory
-            os.makedirs(temp_extract_path, exist_ok=True)
-
-            print("📂 Extracting AntelopeV2 model...")
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(temp_extract_path)
-            print("✅ Extraction complete.")
-
-            # Create the target directory
-            os.makedirs(model_target_path, exist_ok=True)
-
-            # Move the model files to the correct location
-            # The ZIP contains a nested antelopev2 directory we need to move files from
-            nested_model_dir = os.path.join(temp_extract_path, "antelopev2")
-            if os.path.exists(nested_model_dir):
-                for item in os.listdir(nested_model_dir):
-                    source = os.path.join(nested_model_dir, item)
-                    target = os.path.join(model_target_path, item)
-                    shutil.move(source, target)
-
-            # Clean up
-            if os.path.exists(temp_extract_path):
-                shutil.rmtree(temp_extract_path)
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
-
-            print("🗑️ Cleaned up temporary files.")
+            # zipfile needs a seekable file; this one stays in memory unless the archive is large
+            with tempfile.SpooledTemporaryFile(max_size=512 * 1024 * 1024) as archive:
+                with requests.get(download_url, stream=True) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        archive.write(chunk)
+                print("✅ Download complete.")
+
+                # Create the target directory
+                os.makedirs(model_target_path, exist_ok=True)
+
+                # Write the model files straight to their final location, dropping the nested folder
+                print("📂 Extracting AntelopeV2 model...")
+                archive.seek(0)
+                # Both sides absolute, so a relative or trailing-slash COMFYUI_PATH still matches
+                model_root = os.path.abspath(model_target_path)
+                extracted = 0
+                with zipfile.ZipFile(archive) as zip_ref:
+                    for info in zip_ref.infolist():
+                        name = info.filename
+                        if info.is_dir() or not name.startswith(archive_prefix):
+                            continue
+                        relative_name = name[len(archive_prefix):]
+                        target = os.path.abspath(os.path.join(model_root, relative_name))
+                        if not target.startswith(model_root + os.sep):
+                            continue
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with zip_ref.open(info) as source, open(target, "wb") as destination:
+                            shutil.copyfileobj(source, destination)
+                        extracted += 1
+                if not extracted:
+                    raise RuntimeError(f"no model files under {archive_prefix} in the archive")
+                print("✅ Extraction complete.")
+
             print("✅ AntelopeV2 model installed correctly.")
 
         except Exception as e:
+            # A partial folder would look installed on the next run
+            shutil.rmtree(model_target_path, ignore_errors=True)
             print(f"❌ Failed to download/extract AntelopeV2: {e}")
     else:
         print("✅ AntelopeV2 model already exists")
@@ -332,8 +380,6 @@ def download_and_extract_antelopev2():
 
 def install_custom_nodes(platform=PLATFORM_HOSTED):
     """Install all custom nodes for ComfyUI."""
-    # Make sure we have the absolute path to ComfyUI_PATH
-    original_dir = os.getcwd()
     custom_nodes_path = os.path.join(COMFYUI_PATH, "custom_nodes")
 
     # Install ComfyUI-Manager first
@@ -404,6 +450,15 @@ def install_custom_nodes(platform=PLATFORM_HOSTED):
         },
     ]
 
+    # Clones are network-bound and independent, so fetch them side by side; installs into the
+    # shared environment stay sequential below
+    with ThreadPoolExecutor(max_workers=CLONE_WORKERS) as pool:
+        list(pool.map(
+            lambda node: fetch_git_repo(node["repo"], os.path.join(custom_nodes_path, node["name"]),
+                                        submodules=node.get("submodules", False)),
+            custom_nodes_git,
+        ))
+
     for node in custom_nodes_git:
         repo_name = node["name"]
         repo_path = os.path.join(custom_nodes_path, repo_name)
@@ -411,19 +466,14 @@ def install_custom_nodes(platform=PLATFORM_HOSTED):
             node["repo"],
             repo_path,
             requirements=node.get("requirements", False),
-            submodules=node.get("submodules", False),
-            platform=platform
+            platform=platform,
+            fetch=False,
         )
 
         # Handle any post-install commands
         if "post_install" in node:
-            current_dir = os.getcwd()
-            os.chdir(repo_path)
             for command in node["post_install"]:
-                run_cmd(command)
-            os.chdir(current_dir)
-
-    os.chdir(original_dir)
+                run_cmd(command, cwd=repo_path)
 
 
 def final_steps(platform=PLATFORM_HOSTED):
@@ -5,23 +5,24 @@ from diffusers import FluxPipeline
 from dotenv import load_dotenv
 from io import BytesIO
 
-from helpers import find_character_lora, optimize_prompt
-from inference.postprocess import FaceEnhancer
-from inference.safety import SafetyChecker, create_blank_image
+from helpers import find_character_lora, optimize_prompt, refresh_paths
+from inference.postprocess import get_face_enhancer
+from inference.safety import get_safety_checker, create_blank_image
 
 load_dotenv()
+# .env may set APP_PATH, which helpers read at import
+refresh_paths()
 
 
 class LoRAImageGen:
 
-    def __init__(self, face_enhance=False):
+    def __init__(self, face_enhance=False, safety_check=True):
         self.is_prepared = False
         self.pipe = None
-        self.safety_checker = SafetyChecker()
+        self.safety_check = safety_check
+        self.safety_checker = None
         self.face_enhance = face_enhance
         self.face_enhancer = None
-        if self.face_enhance:
-            self.face_enhancer = FaceEnhancer()
 
     def prepare(self):
         """Load the Flux model, move to GPU, and basic optimizations"""
@@ -39,9 +40,10 @@ class LoRAImageGen:
         self.pipe.transformer.to(memory_format=torch.channels_last)
         self.pipe.vae.to(memory_format=torch.channels_last)
         print("✅ Flux loaded successfully")
-        self.safety_checker.prepare()
-        if self.face_enhance and self.face_enhancer:
-            self.face_enhancer.prepare()
+        if self.safety_check:
+            self.safety_checker = get_safety_checker()
+        if self.face_enhance:
+            self.face_enhancer = get_face_enhancer()
         self.is_prepared = True
 
     def do_inference(
@@ -251,7 +253,7 @@ def main():
     parser.set_defaults(do_optimize_prompt=True, fix_outfit=False, safety_check=True, face_enhance=False)
     args = parser.parse_args()
 
-    generator = LoRAImageGen(face_enhance=args.face_enhance)
+    generator = LoRAImageGen(face_enhance=args.face_enhance, safety_check=args.safety_check)
     generated_files = generator.generate(
         character_name=args.character_name,
         prompt=args.prompt,
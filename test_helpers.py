@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the subprocess helpers.
+This script checks how run_subprocess splits streamed output into lines.
+"""
+
+import sys
+
+import helpers
+
+
+def test_crlf_split_across_reads():
+    """Test that a \\r\\n arriving in two reads is a single line break."""
+    print("🧪 Testing CRLF split across reads...")
+
+    # One byte per read puts the \r and the \n in separate reads
+    original_read_size = helpers.STREAM_READ_SIZE
+    helpers.STREAM_READ_SIZE = 1
+    try:
+        output = helpers.run_subprocess([
+            sys.executable, "-c",
+            "import sys; sys.stdout.buffer.write(b'first\\r\\nsecond\\rthird\\r\\n')"
+        ])
+    finally:
+        helpers.STREAM_READ_SIZE = original_read_size
+
+    expected = "first\nsecond\nthird"
+
+    if output == expected:
+        print("  ✅ No empty line from a split \\r\\n")
+    else:
+        print(f"  ❌ Got {output!r} (expected {expected!r})")
+        return False
+
+    print("  ✅ All run_subprocess tests passed!")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("🚀 Testing Subprocess Helpers")
+    print("=" * 50)
+
+    tests = [
+        test_crlf_split_across_reads,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"  ❌ Test failed with exception: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("🎉 All tests passed! The subprocess helpers are working correctly.")
+        return 0
+    else:
+        print("❌ Some tests failed. Please check the implementation.")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
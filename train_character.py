@@ -2,6 +2,7 @@
 
 import argparse
 import gc
+import json
 import os
 import sys
 import torch
@@ -15,6 +16,9 @@ load_dotenv()
 
 from training.generate_sheet import generate_char_sheet
 
+# Printed by the --worker loop after each job, followed by the job's exit code
+WORKER_DONE_MARKER = "__CHARFORGE_WORKER_DONE__"
+
 
 @dataclass
 class CharacterConfig:
@@ -315,7 +319,8 @@ def build_character(config: CharacterConfig):
     return config.work_dir
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Parse command line arguments and run the complete character workflow."""
     parser = argparse.ArgumentParser(description="Train a character")
     parser.add_argument("--name", type=str, help="Character name")
     parser.add_argument("--input", type=str, help="Path to input image")
@@ -361,7 +366,7 @@ if __name__ == "__main__":
     parser.add_argument("--comfyui_vae", type=str, help="ComfyUI VAE path")
     parser.add_argument("--comfyui_lora", type=str, help="ComfyUI LoRA path")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not os.path.exists(args.input):
         print(f"Error: Input image '{args.input}' does not exist.")
@@ -418,3 +423,40 @@ if __name__ == "__main__":
 
     output_dir = build_character(config)
     print(f"Character assets directory: {output_dir}")
+
+
+def run_worker():
+    """
+    Run training jobs in this process so torch and the training stack are imported once.
+
+    Reads one JSON job per line from stdin: {"args": [...], "env": {...}}. Env values of
+    None are removed. After each job a line "WORKER_DONE_MARKER <exit code>" is printed.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        exit_code = 0
+        try:
+            job = json.loads(line)
+            for key, value in job.get("env", {}).items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            main(job["args"])
+        except SystemExit as e:
+            # sys.exit() with no code is a success, like a normal process exit
+            exit_code = 0 if e.code is None else (e.code if isinstance(e.code, int) else 1)
+        except Exception as e:
+            print(f"Error running training job: {e}")
+            exit_code = 1
+        finally:
+            clear_cuda_memory()
+        print(f"{WORKER_DONE_MARKER} {exit_code}", flush=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        run_worker()
+    else:
+        main()